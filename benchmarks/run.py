@@ -0,0 +1,331 @@
+"""
+Throughput benchmarks for the hot paths of IO generation.
+
+Each benchmark repeatedly runs a fixed, seeded amount of work and reports the
+best throughput over several repeats, in operations per second. Results are
+compared with a stored baseline, and the run fails if any benchmark is slower
+than its baseline by more than --threshold.
+
+    ./runbenchmarks                  # compare with benchmarks/baseline.json
+    ./runbenchmarks --save-baseline  # record a new baseline
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from iogen.compiler import compile_source
+from iogen.dsl import get_language
+from iogen.io import (
+    biased_randint,
+    biased_randint_list,
+    find_duplicates,
+    generate_interesting,
+    generate_io_pairs,
+    reduce_io_pairs,
+)
+from iogen.iogen import get_stock_tasks
+from iogen.pool import IOPool
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.3
+
+# The settings quoted in the README: ./io --maxv 10 --max-bound 10, and the
+# default --maxv 99 --max-bound 99.
+MAXV_SETTINGS = (10, 99)
+PROGRAM = "a <- [int] | b <- tail a | c <- last b | d <- count c b"
+NUM_EXAMPLES = 10
+MIN_VARIANCE = 3.5
+
+
+def compile_extended(source, maxv):
+    language = get_language("extended", maxv, 0)
+    with redirect_stdout(io.StringIO()):
+        return compile_source(language, source, maxv, maxv, min_bound=0)
+
+
+def bench_biased_randint(maxv):
+    def run():
+        for _ in range(1000):
+            biased_randint(0, maxv)
+        return 1000
+
+    return run
+
+
+def bench_biased_randint_list(maxv):
+    def run():
+        for _ in range(1000):
+            biased_randint_list(0, maxv, 10)
+        return 1000
+
+    return run
+
+
+def bench_generate_io_pairs(maxv):
+    program = compile_extended(PROGRAM, maxv)
+
+    def run():
+        generate_io_pairs(program, 100, maxv)
+        return 100
+
+    return run
+
+
+def bench_executor_call(maxv):
+    program = compile_extended(PROGRAM, maxv)
+    rng = np.random.default_rng(0)
+    inputs = [i for (i, _) in generate_io_pairs(program, 1000, maxv, rng=rng)]
+
+    def run():
+        for args in inputs:
+            program.fun(args)
+        return len(inputs)
+
+    return run
+
+
+def sample_io_pairs(maxv, n):
+    program = compile_extended(PROGRAM, maxv)
+    return generate_io_pairs(program, n, maxv, rng=np.random.default_rng(0))
+
+
+def bench_find_duplicates(maxv):
+    io_pairs = sample_io_pairs(maxv, 2 * NUM_EXAMPLES)
+
+    def run():
+        for _ in range(100):
+            find_duplicates(io_pairs)
+        return 100
+
+    return run
+
+
+def bench_reduce_io_pairs(maxv):
+    io_pairs = sample_io_pairs(maxv, 2 * NUM_EXAMPLES)
+
+    def run():
+        for _ in range(100):
+            reduce_io_pairs(io_pairs, NUM_EXAMPLES)
+        return 100
+
+    return run
+
+
+def bench_iopool_add(maxv):
+    io_pairs = sample_io_pairs(maxv, 1000)
+
+    def run():
+        pool = IOPool(NUM_EXAMPLES)
+        for start in range(0, len(io_pairs), NUM_EXAMPLES):
+            pool.extend(io_pairs[start : start + NUM_EXAMPLES])
+        return len(io_pairs)
+
+    return run
+
+
+def bench_compile_program(maxv):
+    sources = [t["source"] for t in get_stock_tasks()]
+
+    def run():
+        for source in sources:
+            compile_extended(source, maxv)
+        return len(sources)
+
+    return run
+
+
+def bench_generate_interesting(maxv):
+    """
+    End-to-end generation of the stock tasks, with a sample budget instead of a
+    timeout, so every run does the same work on any machine.
+    """
+    tasks = get_stock_tasks()
+
+    def run():
+        for t in tasks:
+            kwargs = dict(t.get("kwargs", {}))
+            with redirect_stdout(io.StringIO()):
+                generate_interesting(
+                    get_language("extended", maxv, 0),
+                    t["source"],
+                    num_examples=NUM_EXAMPLES,
+                    max_bound=maxv,
+                    maxv=maxv,
+                    min_variance=MIN_VARIANCE,
+                    timeout=None,
+                    min_bound=0,
+                    show_progress=False,
+                    max_samples=1000,
+                    rng=np.random.default_rng(0),
+                    **kwargs
+                )
+        return len(tasks)
+
+    return run
+
+
+def bench_cli_small_job(maxv):
+    """
+    ./io on one program with a small sample budget, in a new process, so the
+    time to start up and import modules dominates.
+    """
+    cmd = [sys.executable, "-m", "iogen.iogen", "--stdin", "-n", "1"]
+    cmd += ["--maxv", str(maxv), "--max-bound", str(maxv)]
+    cmd += ["--max-samples", "100", "--seed", "0"]
+
+    def run():
+        subprocess.run(
+            cmd,
+            input=PROGRAM.encode("utf-8"),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        return 1
+
+    return run
+
+
+BENCHMARKS = [
+    ("biased_randint", bench_biased_randint),
+    ("biased_randint_list", bench_biased_randint_list),
+    ("generate_io_pairs", bench_generate_io_pairs),
+    ("executor_call", bench_executor_call),
+    ("find_duplicates", bench_find_duplicates),
+    ("reduce_io_pairs", bench_reduce_io_pairs),
+    ("iopool_add", bench_iopool_add),
+    ("compile_program", bench_compile_program),
+    ("generate_interesting", bench_generate_interesting),
+    ("cli_small_job", bench_cli_small_job),
+]
+
+
+def measure(run, repeats, min_time):
+    """
+    Best throughput (operations per second) over repeats, where each repeat
+    calls run at least once, until min_time seconds have passed.
+    """
+    best = 0.0
+    for _ in range(repeats):
+        ops = 0
+        start = time.perf_counter()
+        while True:
+            ops += run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, ops / elapsed)
+    return best
+
+
+def run_benchmarks(names=None, repeats=5, min_time=0.2):
+    results = {}
+    for (name, make) in BENCHMARKS:
+        for maxv in MAXV_SETTINGS:
+            key = "{}[maxv={}]".format(name, maxv)
+            if names and not any(n in key for n in names):
+                continue
+            results[key] = measure(make(maxv), repeats, min_time)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns (rows, regressions), where each row is (name, ops/s, baseline ops/s
+    or None, ratio or None), and regressions are the names of benchmarks slower
+    than (1 - threshold) times their baseline.
+    """
+    rows = []
+    regressions = []
+    for (name, ops) in results.items():
+        base = baseline.get(name)
+        ratio = ops / base if base else None
+        rows.append((name, ops, base, ratio))
+        if ratio is not None and ratio < 1.0 - threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_rows(rows):
+    print(
+        "{:<40} {:>14} {:>14} {:>8}".format("benchmark", "ops/s", "baseline", "ratio")
+    )
+    for (name, ops, base, ratio) in rows:
+        print(
+            "{:<40} {:>14.1f} {:>14} {:>8}".format(
+                name,
+                ops,
+                "-" if base is None else "{:.1f}".format(base),
+                "-" if ratio is None else "{:.2f}".format(ratio),
+            )
+        )
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        help="write the results to the baseline file instead of comparing",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--threshold",
+        help="allowed slowdown relative to the baseline (default: 0.3)",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        help="seconds to run each repeat of a benchmark",
+        type=float,
+        default=0.2,
+    )
+    parser.add_argument(
+        "-k", "--filter", help="only run benchmarks whose name contains", nargs="*"
+    )
+    return parser.parse_args(args)
+
+
+def main(args):
+    """Runs the benchmarks. Returns 1 if any regressed past the threshold."""
+    results = run_benchmarks(args.filter, args.repeats, args.min_time)
+    baseline = load_baseline(args.baseline)
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print_rows(compare(results, {}, args.threshold)[0])
+        print(args.baseline)
+        return 0
+    rows, regressions = compare(results, baseline, args.threshold)
+    print_rows(rows)
+    if regressions:
+        print()
+        print("Regressed by more than {:.0%}:".format(args.threshold))
+        for name in regressions:
+            print("  " + name)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,389 @@
+import numpy as np
+
+
+class ListBatch(object):
+    """
+    A batch of int lists, stored as a padded 2-D array with one row per example
+    plus a vector of list lengths. Padding is always zero.
+    """
+
+    def __init__(self, data, lengths):
+        self.data = data
+        self.lengths = lengths
+
+    @classmethod
+    def from_lists(cls, lists):
+        lengths = np.array([len(l) for l in lists], dtype=np.int64)
+        width = int(lengths.max()) if len(lists) else 0
+        data = np.zeros((len(lists), width), dtype=np.int64)
+        data[np.arange(width) < lengths[:, None]] = [i for l in lists for i in l]
+        return cls(data, lengths)
+
+    @classmethod
+    def from_items(cls, items, lengths):
+        """Builds a batch from the items of all lists, concatenated, and their lengths."""
+        lengths = np.asarray(lengths, dtype=np.int64)
+        width = int(lengths.max()) if len(lengths) else 0
+        data = np.zeros((len(lengths), width), dtype=np.int64)
+        data[np.arange(width) < lengths[:, None]] = items
+        return cls(data, lengths)
+
+    @classmethod
+    def from_padded(cls, data, lengths):
+        """Builds a batch from data with arbitrary padding, zeroing the padding."""
+        return cls(np.where(valid_mask(data, lengths), data, 0), lengths)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def valid(self):
+        return valid_mask(self.data, self.lengths)
+
+    def tolist(self):
+        return [row[:l] for (row, l) in zip(self.data.tolist(), self.lengths.tolist())]
+
+
+def valid_mask(data, lengths):
+    return np.arange(data.shape[1]) < lengths[:, None]
+
+
+class Fallback(Exception):
+    """Raised by a kernel when it cannot handle a batch (e.g. an empty list)."""
+
+
+def trunc_div(x, d):
+    """Integer division rounding toward zero, like int(float(x) / d)."""
+    return np.sign(x) * (np.abs(x) // d)
+
+
+ELEMENTWISE = {
+    # extended
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    ">": np.greater,
+    "<": np.less,
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "positive?": lambda x: x > 0,
+    "negative?": lambda x: x < 0,
+    "odd?": lambda x: x % 2 == 1,
+    "even?": lambda x: x % 2 == 0,
+    # linq
+    "IDT": lambda x: x,
+    "INC": lambda x: x + 1,
+    "DEC": lambda x: x - 1,
+    "SHL": lambda x: x * 2,
+    "SHR": lambda x: trunc_div(x, 2),
+    "doNEG": np.negative,
+    "MUL3": lambda x: x * 3,
+    "DIV3": lambda x: trunc_div(x, 3),
+    "MUL4": lambda x: x * 4,
+    "DIV4": lambda x: trunc_div(x, 4),
+    "SQR": lambda x: x * x,
+    "isPOS": lambda x: x > 0,
+    "isNEG": lambda x: x < 0,
+    "isODD": lambda x: x % 2 == 1,
+    "isEVEN": lambda x: x % 2 == 0,
+    "MIN": np.minimum,
+    "MAX": np.maximum,
+}
+
+
+def null_value(func):
+    """
+    The value a DSL function returns for an empty list (its Null), or raises
+    Fallback if the function is undefined on empty lists.
+    """
+    args = [[] if t == [int] else 0 for t in func.sig[:-1]]
+    try:
+        return func.fun(*args)
+    except (ValueError, IndexError, TypeError):
+        raise Fallback()
+
+
+def require_non_empty(xs):
+    if (xs.lengths == 0).any():
+        raise Fallback()
+
+
+def require_non_negative(n):
+    if (n < 0).any():
+        raise Fallback()
+
+
+def head(func, xs):
+    if xs.data.shape[1] == 0:
+        return np.full(len(xs.lengths), null_value(func), dtype=np.int64)
+    return np.where(xs.lengths > 0, xs.data[:, 0], empty_value(func, xs))
+
+
+def last(func, xs):
+    if xs.data.shape[1] == 0:
+        return np.full(len(xs.lengths), null_value(func), dtype=np.int64)
+    rows = np.arange(len(xs.lengths))
+    values = xs.data[rows, np.maximum(xs.lengths - 1, 0)]
+    return np.where(xs.lengths > 0, values, empty_value(func, xs))
+
+
+def empty_value(func, xs):
+    """Null for the empty lists of a batch, only computed if there are any."""
+    if (xs.lengths == 0).any():
+        return null_value(func)
+    return 0
+
+
+def tail(func, xs):
+    require_non_empty(xs)
+    return ListBatch(xs.data[:, 1:], xs.lengths - 1)
+
+
+def reverse(func, xs):
+    width = xs.data.shape[1]
+    index = xs.lengths[:, None] - 1 - np.arange(width)
+    data = np.take_along_axis(xs.data, np.maximum(index, 0), axis=1)
+    return ListBatch.from_padded(data, xs.lengths)
+
+
+def sort(func, xs):
+    data = np.sort(np.where(xs.valid(), xs.data, np.iinfo(np.int64).max), axis=1)
+    return ListBatch.from_padded(data, xs.lengths)
+
+
+def length(func, xs):
+    return xs.lengths.copy()
+
+
+def list_sum(func, xs):
+    return xs.data.sum(axis=1)
+
+
+def reduction(ufunc, fill):
+    def kernel(func, xs):
+        values = ufunc.reduce(np.where(xs.valid(), xs.data, fill), axis=1, initial=fill)
+        return np.where(xs.lengths > 0, values, empty_value(func, xs))
+
+    return kernel
+
+
+def count(func, n, xs):
+    return ((xs.data == n[:, None]) & xs.valid()).sum(axis=1)
+
+
+def access(func, n, xs):
+    if xs.data.shape[1] == 0:
+        return np.full(len(xs.lengths), null_value(func), dtype=np.int64)
+    in_range = (n >= 0) & (n < xs.lengths)
+    rows = np.arange(len(xs.lengths))
+    values = xs.data[rows, np.clip(n, 0, xs.data.shape[1] - 1)]
+    if in_range.all():
+        return values
+    return np.where(in_range, values, null_value(func))
+
+
+def take(func, n, xs):
+    require_non_negative(n)
+    return ListBatch.from_padded(xs.data, np.minimum(xs.lengths, n))
+
+
+def drop(func, n, xs):
+    require_non_negative(n)
+    width = xs.data.shape[1]
+    index = np.minimum(np.arange(width) + n[:, None], max(width - 1, 0))
+    data = np.take_along_axis(xs.data, index, axis=1)
+    return ListBatch.from_padded(data, np.maximum(xs.lengths - n, 0))
+
+
+def filter_list(xs, keep):
+    keep = keep & xs.valid()
+    order = np.argsort(~keep, axis=1, kind="stable")
+    data = np.take_along_axis(xs.data, order, axis=1)
+    return ListBatch.from_padded(data, keep.sum(axis=1))
+
+
+def map_kernel(op, curried):
+    if curried:
+        # map(f) n xs applies f(x, n) to each item
+        return lambda func, n, xs: ListBatch.from_padded(
+            op(xs.data, n[:, None]), xs.lengths
+        )
+    return lambda func, xs: ListBatch.from_padded(op(xs.data), xs.lengths)
+
+
+def filter_kernel(op, curried):
+    if curried:
+        return lambda func, n, xs: filter_list(xs, op(xs.data, n[:, None]))
+    return lambda func, xs: filter_list(xs, op(xs.data))
+
+
+def count_kernel(op):
+    return lambda func, xs: (op(xs.data) & xs.valid()).sum(axis=1)
+
+
+def zipwith_kernel(op):
+    def kernel(func, xs, ys):
+        width = min(xs.data.shape[1], ys.data.shape[1])
+        data = op(xs.data[:, :width], ys.data[:, :width])
+        return ListBatch.from_padded(data, np.minimum(xs.lengths, ys.lengths))
+
+    return kernel
+
+
+def scanl1_kernel(src, op):
+    def kernel(func, xs):
+        if xs.data.shape[1] == 0:
+            return xs
+        if src == "-":
+            # x0, x0 - x1, x0 - x1 - x2, ...
+            data = 2 * xs.data[:, :1] - np.cumsum(xs.data, axis=1)
+        else:
+            data = op.accumulate(xs.data, axis=1)
+        return ListBatch.from_padded(data, xs.lengths)
+
+    return kernel
+
+
+def elementwise_kernel(op):
+    return lambda func, *args: op(*args)
+
+
+KERNELS = {
+    "head": head,
+    "HEAD": head,
+    "last": last,
+    "LAST": last,
+    "tail": tail,
+    "TAIL": tail,
+    "reverse": reverse,
+    "REVERSE": reverse,
+    "sort": sort,
+    "SORT": sort,
+    "len": length,
+    "LEN": length,
+    "sum": list_sum,
+    "SUM": list_sum,
+    "max": reduction(np.maximum, np.iinfo(np.int64).min),
+    "MAXIMUM": reduction(np.maximum, np.iinfo(np.int64).min),
+    "min": reduction(np.minimum, np.iinfo(np.int64).max),
+    "MINIMUM": reduction(np.minimum, np.iinfo(np.int64).max),
+    "count": count,
+    "COUNT": count,
+    "index": access,
+    "ACCESS": access,
+    "TAKE": take,
+    "DROP": drop,
+}
+
+
+def get_kernel(func):
+    """
+    Returns the vectorized kernel for a DSL function, or None if it has none.
+    Kernels are called as kernel(func, *args) with batched arguments.
+    """
+    src = func.src
+    if src in KERNELS:
+        return KERNELS[src]
+    if src in ELEMENTWISE:
+        return elementwise_kernel(ELEMENTWISE[src])
+    curried = func.sig[0] == int
+    for prefix, make_kernel in (
+        ("map(", lambda op: map_kernel(op, curried)),
+        ("filter(", lambda op: filter_kernel(op, curried)),
+    ):
+        if src.startswith(prefix) and src.endswith(")"):
+            op = ELEMENTWISE.get(src[len(prefix) : -1])
+            return make_kernel(op) if op is not None else None
+    command, _, lambda_src = src.partition(" ")
+    op = ELEMENTWISE.get(lambda_src)
+    if op is None:
+        return None
+    if command == "MAP":
+        return map_kernel(op, curried=False)
+    elif command == "FILTER":
+        return filter_kernel(op, curried=False)
+    elif command == "COUNT":
+        return count_kernel(op)
+    elif command == "ZIPWITH":
+        return zipwith_kernel(op)
+    elif command == "SCANL1":
+        return scanl1_kernel(lambda_src, op)
+    return None
+
+
+def to_batch(values, value_type):
+    """
+    Converts per-example Python values to their batched representation: an int
+    or bool array, a ListBatch, or (for values that do not share the declared
+    type, such as a Null int returned instead of a list) the list itself.
+    """
+    if value_type == [int]:
+        if all(isinstance(v, list) for v in values):
+            return ListBatch.from_lists(values)
+    elif value_type == bool:
+        if all(isinstance(v, (bool, np.bool_)) for v in values):
+            return np.array(values, dtype=bool)
+    elif value_type == int:
+        if all(isinstance(v, (int, np.integer)) for v in values):
+            return np.array(values, dtype=np.int64)
+    return list(values)
+
+
+def to_python(value):
+    """Converts a batched value back to a list of per-example Python values."""
+    if isinstance(value, (ListBatch, np.ndarray)):
+        return value.tolist()
+    return value
+
+
+class BatchExecutor(object):
+    """
+    Executes a program over a whole batch of inputs at once. List values are
+    stored as padded 2-D arrays (see ListBatch) and each instruction runs as a
+    single vectorized kernel. Instructions without a kernel, or batches a kernel
+    cannot handle, fall back to calling the DSL function once per example.
+    """
+
+    def __init__(self, input_types, functions, pointers, program_length):
+        self.input_types = list(input_types)
+        self.functions = list(functions)
+        self.pointers = list(pointers)
+        self.program_length = program_length
+        self.kernels = [f and get_kernel(f) for f in self.functions]
+
+    def __call__(self, args):
+        assert len(args) == len(self.input_types)
+        return self.run_batch([args])[0]
+
+    def run_batch(self, inputs):
+        if not inputs:
+            return []
+        columns = [
+            to_batch([args[t] for args in inputs], self.input_types[t])
+            for t in range(len(self.input_types))
+        ]
+        return to_python(self.run_columns(columns))
+
+    def run_columns(self, columns):
+        """
+        Runs the program on inputs that are already batched, one column (an int
+        array or a ListBatch) per argument, and returns the batched output.
+        """
+        registers = [None] * self.program_length
+        registers[: len(columns)] = columns
+        for t in range(len(columns), self.program_length):
+            args = [registers[p] for p in self.pointers[t]]
+            registers[t] = self.execute(t, args)
+        return registers[-1]
+
+    def execute(self, t, args):
+        func = self.functions[t]
+        kernel = self.kernels[t]
+        if kernel is not None and not any(isinstance(a, list) for a in args):
+            try:
+                return kernel(func, *args)
+            except Fallback:
+                pass
+        columns = [to_python(a) for a in args]
+        values = [func.fun(*example_args) for example_args in zip(*columns)]
+        return to_batch(values, func.sig[-1])
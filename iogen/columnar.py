@@ -0,0 +1,274 @@
+"""
+A compact, columnar binary format for IO examples, read through a memory map.
+
+The file starts with MAGIC, a little-endian uint64 header length, and a JSON
+header that gives the dtype, byte offset and length of each column. Columns are
+flat little-endian arrays, aligned to 8 bytes. Integer columns use the smallest
+of int8, int16, int32 and int64 that holds their values:
+
+    task_examples    int [tasks + 1]     first example of each task
+    example_values   int [examples + 1]  first value of each example (inputs,
+                                         then the output)
+    value_kinds      uint8 [values]      INT, BOOL or LIST
+    value_items      int [values + 1]    first item of each value
+    items            int [items]         ints, and list items, of every value
+    output_variance  float64 [tasks]
+    program, task_key                    strings, stored as <name>_offsets
+                                         int [tasks + 1] and <name>_bytes
+                                         uint8 (UTF-8)
+
+    write_columnar(results, "io.bin")
+    reader = ColumnarReader("io.bin")
+    (inputs, output) = reader.example(task_index, example_index)
+"""
+
+import argparse
+import json
+import mmap
+import sys
+
+import numpy as np
+
+from iogen.output import serialize_result
+
+MAGIC = b"IOGENCOL"
+VERSION = 1
+ALIGNMENT = 8
+
+INT = 0
+LIST = 1
+BOOL = 2
+
+STRING_COLUMNS = ("program", "task_key")
+INT_DTYPES = ("<i1", "<i2", "<i4", "<i8")
+
+
+def int_column(values):
+    """An array of values with the smallest of INT_DTYPES that holds them all."""
+    array = np.array(values, dtype="<i8")
+    if len(array) == 0:
+        return array.astype(INT_DTYPES[0])
+    low, high = array.min(), array.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return array.astype(dtype)
+
+
+def _string_column(strings):
+    data = [s.encode("utf-8") for s in strings]
+    offsets = int_column(np.cumsum([0] + [len(b) for b in data]))
+    return offsets, np.frombuffer(b"".join(data), dtype=np.uint8)
+
+
+def build_columns(results):
+    """Returns the columns of results (dicts as written by --json), by name."""
+    task_examples = [0]
+    example_values = [0]
+    value_kinds = []
+    value_items = [0]
+    items = []
+    output_variance = []
+    strings = {name: [] for name in STRING_COLUMNS}
+    for d in results:
+        d = serialize_result(d)
+        for pair in d["io_pairs"]:
+            for v in list(pair["i"]) + [pair["o"]]:
+                if isinstance(v, list):
+                    value_kinds.append(LIST)
+                    items.extend(v)
+                elif isinstance(v, bool):
+                    value_kinds.append(BOOL)
+                    items.append(int(v))
+                else:
+                    value_kinds.append(INT)
+                    items.append(v)
+                value_items.append(len(items))
+            example_values.append(len(value_kinds))
+        task_examples.append(len(example_values) - 1)
+        variance = d.get("output_variance")
+        output_variance.append(np.nan if variance is None else variance)
+        for name in STRING_COLUMNS:
+            strings[name].append(d.get(name) or "")
+
+    columns = {
+        "task_examples": int_column(task_examples),
+        "example_values": int_column(example_values),
+        "value_kinds": np.array(value_kinds, dtype=np.uint8),
+        "value_items": int_column(value_items),
+        "items": int_column(items),
+        "output_variance": np.array(output_variance, dtype="<f8"),
+    }
+    for name in STRING_COLUMNS:
+        offsets, data = _string_column(strings[name])
+        columns[name + "_offsets"] = offsets
+        columns[name + "_bytes"] = data
+    return columns
+
+
+def _padding(n):
+    return -n % ALIGNMENT
+
+
+def write_columnar(results, path):
+    columns = build_columns(results)
+    table = {}
+    offset = 0
+    for (name, array) in columns.items():
+        table[name] = {
+            "dtype": array.dtype.str,
+            "offset": offset,
+            "length": len(array),
+        }
+        offset += array.nbytes + _padding(array.nbytes)
+    header = json.dumps(
+        {
+            "version": VERSION,
+            "num_tasks": len(columns["task_examples"]) - 1,
+            "columns": table,
+        }
+    ).encode("utf-8")
+    header += b" " * _padding(len(MAGIC) + 8 + len(header))
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.array(len(header), dtype="<u8").tobytes())
+        f.write(header)
+        for array in columns.values():
+            f.write(array.tobytes())
+            f.write(b"\0" * _padding(array.nbytes))
+
+
+class ColumnarReader(object):
+    """
+    Random access to a file written by write_columnar. The file is memory-mapped,
+    and only the header is parsed when it is opened; values are read on access.
+    List values are returned as read-only integer arrays backed by the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("Not a columnar IO file ({})".format(path))
+        start = len(MAGIC) + 8
+        header_length = int(np.frombuffer(self.mm, dtype="<u8", count=1, offset=8)[0])
+        self.header = json.loads(self.mm[start : start + header_length].decode("utf-8"))
+        if self.header["version"] != VERSION:
+            self.close()
+            raise ValueError(
+                "Unsupported columnar IO file version ({})".format(
+                    self.header["version"]
+                )
+            )
+        data_start = start + header_length
+        self.columns = {}
+        for (name, c) in self.header["columns"].items():
+            self.columns[name] = np.frombuffer(
+                self.mm,
+                dtype=np.dtype(c["dtype"]),
+                count=c["length"],
+                offset=data_start + c["offset"],
+            )
+
+    def __len__(self):
+        return self.header["num_tasks"]
+
+    def _string(self, name, task_index):
+        offsets = self.columns[name + "_offsets"]
+        start, end = offsets[task_index], offsets[task_index + 1]
+        return self.columns[name + "_bytes"][start:end].tobytes().decode("utf-8")
+
+    def program(self, task_index):
+        return self._string("program", task_index)
+
+    def task_key(self, task_index):
+        return self._string("task_key", task_index) or None
+
+    def output_variance(self, task_index):
+        return float(self.columns["output_variance"][task_index])
+
+    def num_examples(self, task_index):
+        task_examples = self.columns["task_examples"]
+        return int(task_examples[task_index + 1] - task_examples[task_index])
+
+    def value(self, value_index):
+        value_items = self.columns["value_items"]
+        start, end = value_items[value_index], value_items[value_index + 1]
+        kind = self.columns["value_kinds"][value_index]
+        if kind == LIST:
+            return self.columns["items"][start:end]
+        if kind == BOOL:
+            return bool(self.columns["items"][start])
+        return int(self.columns["items"][start])
+
+    def example(self, task_index, example_index):
+        """Returns (inputs, output) of an example of a task."""
+        if not 0 <= example_index < self.num_examples(task_index):
+            raise IndexError("Example index out of range ({})".format(example_index))
+        e = self.columns["task_examples"][task_index] + example_index
+        example_values = self.columns["example_values"]
+        start, end = example_values[e], example_values[e + 1]
+        values = [self.value(v) for v in range(start, end)]
+        return values[:-1], values[-1]
+
+    def task(self, task_index):
+        """Returns a task as a dict of plain Python values, like --json results."""
+        io_pairs = []
+        for e in range(self.num_examples(task_index)):
+            inputs, output = self.example(task_index, e)
+            io_pairs.append(
+                {"i": [to_python(v) for v in inputs], "o": to_python(output)}
+            )
+        d = {
+            "program": self.program(task_index),
+            "io_pairs": io_pairs,
+            "output_variance": self.output_variance(task_index),
+        }
+        if self.task_key(task_index) is not None:
+            d["task_key"] = self.task_key(task_index)
+        return d
+
+    def close(self):
+        # Arrays returned by the reader keep the memory map open until they are
+        # garbage collected, so closing the map can fail while they are alive.
+        self.columns = {}
+        try:
+            self.mm.close()
+        except BufferError:
+            pass
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def to_python(value):
+    return value.tolist() if isinstance(value, np.ndarray) else value
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description="Convert --json or --jsonl output to the columnar binary format."
+    )
+    parser.add_argument("input", help="a .json or .jsonl file of results")
+    parser.add_argument("output")
+    return parser.parse_args(args)
+
+
+def main(args):
+    with open(args.input) as f:
+        if args.input.endswith(".jsonl"):
+            results = [json.loads(line) for line in f if line.strip()]
+        else:
+            results = json.load(f)
+    write_columnar(results, args.output)
+    print(args.output)
+
+
+if __name__ == "__main__":
+    main(parse_args(sys.argv[1:]))
@@ -4,6 +4,9 @@ Program = namedtuple("Program", ["src", "ins", "out", "fun", "bounds"])
 
 
 def get_language_dict(language):
+    commands = getattr(language, "commands", None)
+    if commands is not None:
+        return commands
     return {l.src: l for l in language}
 
 
@@ -14,6 +17,7 @@ def compile_program(
     max_list_item_val,
     min_input_range_length=0,
     min_bound=None,
+    backend="interpreter",
 ):
     """
     Parses a program into an intermediate representation capable of constraints
@@ -25,6 +29,7 @@ def compile_program(
         - max_bound: max value allowed as integer
         - max_list_item_val: max value allowed as int for list item
         - min_bound: min value allowed as integer (default: -max_bound)
+        - backend: program executor, one of BACKENDS (default: "interpreter")
     """
     functions, input_types, pointers, types = parse_source(language, source_code)
     input_length = len(input_types)
@@ -46,13 +51,30 @@ def compile_program(
         print("WARN: PropagationError")
         return None
 
-    program_executor = Executor(input_types, functions, pointers, program_length)
+    program_executor = BACKENDS[backend](input_types, functions, pointers, program_length)
 
     return Program(
         source_code, input_types, types[-1], program_executor, limits[:input_length]
     )
 
 
+def compile_source(
+    language, source, max_bound, maxv, min_bound=None, backend="interpreter"
+):
+    """
+    Compiles a program with compile_program, where the program may be written on
+    one line with " | " between its instructions, as in --from-txt files.
+    """
+    return compile_program(
+        language,
+        source.replace(" | ", "\n"),
+        max_bound=max_bound,
+        max_list_item_val=maxv,
+        min_bound=min_bound,
+        backend=backend,
+    )
+
+
 class Executor(object):
     def __init__(self, input_types, functions, pointers, program_length, debug=False):
         self.input_types = list(input_types)
@@ -84,6 +106,92 @@ class Executor(object):
             registers[t] = res
         return registers[-1]
 
+    def run_batch(self, inputs):
+        return [self(args) for args in inputs]
+
+
+class CodegenExecutor(object):
+    """
+    Executes a program like Executor, but compiles it once into a straight-line
+    Python function, with registers as local variables and the DSL functions
+    bound as constants, so no interpretation happens per call. Calls fail like
+    Executor calls: an AssertionError for a wrong number of arguments, and a
+    DSL function's TypeError is reported with the failing function and its args
+    (by running the same inputs through an Executor).
+    """
+
+    def __init__(self, input_types, functions, pointers, program_length):
+        self.input_types = list(input_types)
+        self.functions = list(functions)
+        self.pointers = list(pointers)
+        self.program_length = program_length
+        self.source = generate_function_source(
+            len(self.input_types), self.pointers, program_length
+        )
+        namespace = {
+            "f{}".format(t): self.functions[t].fun
+            for t in range(len(self.input_types), program_length)
+        }
+        namespace["failed"] = self.failed
+        exec(compile(self.source, "<program>", "exec"), namespace)
+        self.fun = namespace["program"]
+
+    def __call__(self, args):
+        return self.fun(args)
+
+    def run_batch(self, inputs):
+        return list(map(self.fun, inputs))
+
+    def failed(self, args):
+        # Only called once a call has raised, so the hot path is not slowed down.
+        Executor(self.input_types, self.functions, self.pointers, self.program_length)(
+            args
+        )
+
+
+def generate_function_source(input_length, pointers, program_length):
+    """
+    Generates the source of a function equivalent to a program. For example,
+    "a <- [int] | b <- int | c <- count b a" becomes:
+
+        def program(args):
+            assert len(args) == 2
+            r0, r1, = args
+            try:
+                r2 = f2(r1, r0)
+            except TypeError:
+                failed(args)
+                raise
+            return r2
+    """
+    registers = ["r{}".format(t) for t in range(program_length)]
+    lines = ["def program(args):"]
+    lines.append("    assert len(args) == {}".format(input_length))
+    lines.append("    {}, = args".format(", ".join(registers[:input_length])))
+    lines.append("    try:")
+    for t in range(input_length, program_length):
+        args = ", ".join(registers[p] for p in pointers[t])
+        lines.append("        {} = f{}({})".format(registers[t], t, args))
+    lines.append("    except TypeError:")
+    lines.append("        failed(args)")
+    lines.append("        raise")
+    lines.append("    return {}".format(registers[-1]))
+    return "\n".join(lines) + "\n"
+
+
+def _batch_executor(*args):
+    # Imported on first use, so programs that are not batched do not load NumPy.
+    from iogen.batch import BatchExecutor
+
+    return BatchExecutor(*args)
+
+
+BACKENDS = {
+    "interpreter": Executor,
+    "codegen": CodegenExecutor,
+    "numpy": _batch_executor,
+}
+
 
 def parse_source(language, source_code):
     lang_dict = get_language_dict(language)
@@ -1,29 +1,62 @@
-from iogen.dsl.extended import get_extended_dsl
-from iogen.dsl.linq import get_linq_dsl
-from iogen.dsl.simple import get_list_dsl
+# The DSL modules are imported by their builders, so only the selected DSL is loaded.
 
 
-def get_language_func(choice):
-    if choice == "simplelist":
+def _build_simplelist(max_bound, min_bound):
+    from iogen.dsl.simple import get_list_dsl
+
+    return get_list_dsl(max_bound)
+
+
+def _build_extended(max_bound, min_bound):
+    from iogen.dsl.extended import get_extended_dsl
+
+    return get_extended_dsl(max_bound, min_bound=min_bound)
+
+
+def _build_linq(max_bound, min_bound):
+    from iogen.dsl.linq import get_linq_dsl
+
+    return get_linq_dsl(max_bound, min_bound=min_bound)[0]
 
-        def f(kwargs):
-            return get_list_dsl(kwargs["max_bound"])
 
-        return f
-    elif choice == "extended":
+LANGUAGE_BUILDERS = {
+    "simplelist": _build_simplelist,
+    "extended": _build_extended,
+    "linq": _build_linq,
+}
 
-        def f(kwargs):
-            return get_extended_dsl(kwargs["max_bound"], min_bound=kwargs["min_bound"])
+_languages = {}
 
-        return f
-    elif choice == "linq":
 
-        def f(kwargs):
-            language, _ = get_linq_dsl(
-                kwargs["max_bound"], min_bound=kwargs["min_bound"]
-            )
-            return language
+class Language(list):
+    """
+    A DSL (list of Functions) with a precomputed index from command names,
+    including compound names such as "map(+)" or "MAP INC", to Functions.
+    """
 
-        return f
-    else:
+    def __init__(self, functions):
+        super(Language, self).__init__(functions)
+        self.commands = {f.src: f for f in self}
+
+
+def get_language(choice, max_bound, min_bound=None):
+    """
+    Returns the DSL for a language choice. Each DSL is built once per
+    (choice, max_bound, min_bound) and shared by all later calls.
+    """
+    key = (choice, max_bound, min_bound)
+    if key not in _languages:
+        if choice not in LANGUAGE_BUILDERS:
+            raise ValueError("Language type ({}) not recognized.".format(choice))
+        _languages[key] = Language(LANGUAGE_BUILDERS[choice](max_bound, min_bound))
+    return _languages[key]
+
+
+def get_language_func(choice):
+    if choice not in LANGUAGE_BUILDERS:
         raise ValueError("Language type ({}) not recognized.".format(choice))
+
+    def f(kwargs):
+        return get_language(choice, kwargs["max_bound"], kwargs["min_bound"])
+
+    return f
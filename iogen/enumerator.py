@@ -0,0 +1,247 @@
+import argparse
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+from itertools import product
+
+from iogen.compiler import compile_source
+from iogen.dsl import LANGUAGE_BUILDERS, get_language
+from iogen.fingerprint import ERROR, fingerprint, probe_inputs
+
+INPUT_TYPES = {"int": int, "[int]": [int]}
+REGISTER_NAMES = "abcdefghijklmnopqrstuvwxyz"
+
+
+def type_name(t):
+    if t == int:
+        return "int"
+    elif t == [int]:
+        return "[int]"
+    elif t == bool:
+        return "bool"
+    raise ValueError("Unsupported type ({})".format(t))
+
+
+def apply_function(f, arg_values):
+    """Applies f to the values of its argument registers on every probe."""
+    values = []
+    for args in zip(*arg_values):
+        if any(isinstance(a, str) and a == ERROR for a in args):
+            values.append(ERROR)
+            continue
+        try:
+            values.append(f.fun(*args))
+        except Exception:
+            values.append(ERROR)
+    return values
+
+
+class ProgramEnumerator(object):
+    """
+    Enumerates well-typed programs over a DSL, using the Function.sig types to
+    pick argument registers, up to max_length instructions after the inputs.
+
+    Programs are compared by their register values on a fixed set of probe
+    inputs (see iogen.fingerprint), which prunes:
+      - instructions whose value equals a register already in the program,
+      - programs reaching a set of register values already reached by a program
+        at most as long (their extensions have already been enumerated),
+      - programs whose output matches the output of an already emitted program.
+    Only programs that use every input and intermediate register, and whose
+    output is not the same on every probe, are emitted. Programs are emitted in
+    order of length (by iterative deepening), so each output is represented by
+    one of the shortest programs computing it.
+    """
+
+    def __init__(self, language, input_types, max_length, probes, is_valid=None):
+        self.language = language
+        self.input_types = list(input_types)
+        self.max_length = max_length
+        self.probes = probes
+        self.is_valid = is_valid
+        self.seen_outputs = set()
+        self.seen_states = {}
+        self.length = 0
+
+    def programs(self):
+        """Yields program sources in the "a <- [int] | b <- ..." format."""
+        n = len(self.input_types)
+        self.types = list(self.input_types)
+        self.values = [[args[t] for args in self.probes] for t in range(n)]
+        self.keys = [self.register_key(t, v) for (t, v) in zip(self.types, self.values)]
+        self.uses = [0] * n
+        self.lines = [
+            "{} <- {}".format(REGISTER_NAMES[t], type_name(self.types[t]))
+            for t in range(n)
+        ]
+        for length in range(1, self.max_length + 1):
+            self.length = length
+            self.seen_states = {}
+            yield from self.extend()
+
+    def register_key(self, t, values):
+        return (type_name(t), fingerprint(values))
+
+    def extend(self):
+        if len(self.types) - len(self.input_types) >= self.length:
+            return
+        if len(self.types) >= len(REGISTER_NAMES):
+            return
+        for f in self.language:
+            candidates = [
+                [r for r in range(len(self.types)) if self.types[r] == t]
+                for t in f.sig[:-1]
+            ]
+            for pointers in product(*candidates):
+                values = apply_function(f, [self.values[p] for p in pointers])
+                if all(isinstance(v, str) and v == ERROR for v in values):
+                    continue
+                key = self.register_key(f.sig[-1], values)
+                if key in self.keys:
+                    continue
+                self.push(f, pointers, values, key)
+                if self.is_new_state():
+                    if len(self.types) - len(self.input_types) == self.length:
+                        source = self.emit()
+                        if source is not None:
+                            yield source
+                    yield from self.extend()
+                self.pop(pointers)
+
+    def push(self, f, pointers, values, key):
+        args = " ".join(REGISTER_NAMES[p] for p in pointers)
+        self.lines.append(
+            "{} <- {} {}".format(REGISTER_NAMES[len(self.types)], f.src, args)
+        )
+        self.types.append(f.sig[-1])
+        self.values.append(values)
+        self.keys.append(key)
+        self.uses.append(0)
+        for p in pointers:
+            self.uses[p] += 1
+
+    def pop(self, pointers):
+        for p in pointers:
+            self.uses[p] -= 1
+        self.lines.pop()
+        self.types.pop()
+        self.values.pop()
+        self.keys.pop()
+        self.uses.pop()
+
+    def is_new_state(self):
+        unused = frozenset(k for (k, u) in zip(self.keys[:-1], self.uses) if u == 0)
+        state = (frozenset(self.keys), self.keys[-1], unused)
+        length = len(self.types)
+        if self.seen_states.get(state, length + 1) <= length:
+            return False
+        self.seen_states[state] = length
+        return True
+
+    def emit(self):
+        if not all(self.uses[:-1]):
+            return None
+        if self.keys[-1] in self.seen_outputs:
+            return None
+        if is_constant(self.values[-1]):
+            return None
+        source = " | ".join(self.lines)
+        if self.is_valid is not None and not self.is_valid(source):
+            return None
+        self.seen_outputs.add(self.keys[-1])
+        return source
+
+
+def is_constant(values):
+    return all(v == values[0] for v in values[1:])
+
+
+def compiles(language, max_bound, maxv, min_bound):
+    """Returns a check that a source compiles and has valid input bounds."""
+
+    def is_valid(source):
+        try:
+            with redirect_stdout(io.StringIO()):
+                program = compile_source(
+                    language, source, max_bound, maxv, min_bound=min_bound
+                )
+        except Exception:
+            return False
+        return program is not None
+
+    return is_valid
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description="Enumerate distinct well-typed programs over a DSL."
+    )
+    parser.add_argument(
+        "--language", choices=sorted(LANGUAGE_BUILDERS), default="extended"
+    )
+    parser.add_argument(
+        "--inputs",
+        help="input types of the programs",
+        nargs="+",
+        choices=sorted(INPUT_TYPES),
+        default=["[int]"],
+    )
+    parser.add_argument(
+        "-k",
+        "--max-length",
+        help="max number of instructions after the inputs",
+        type=int,
+        default=2,
+    )
+    parser.add_argument("--num-probes", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-bound", type=int, default=0)
+    parser.add_argument("--max-bound", type=int, default=99)
+    parser.add_argument("--maxv", help="max val for item in list", type=int, default=99)
+    parser.add_argument("--max-io-len", type=int, default=10)
+    parser.add_argument(
+        "--no-compile-check",
+        help="also emit programs that fail constraint propagation",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument("-o", "--output", help="write programs to a file")
+    return parser.parse_args(args)
+
+
+def main(args):
+    language = get_language(args.language, args.max_bound, args.min_bound)
+    input_types = [INPUT_TYPES[t] for t in args.inputs]
+    probes = probe_inputs(
+        input_types,
+        num_probes=args.num_probes,
+        min_value=args.min_bound,
+        max_value=args.maxv,
+        max_len=args.max_io_len,
+        seed=args.seed,
+    )
+    is_valid = None
+    if not args.no_compile_check:
+        is_valid = compiles(language, args.max_bound, args.maxv, args.min_bound)
+    enumerator = ProgramEnumerator(
+        language, input_types, args.max_length, probes, is_valid
+    )
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for source in enumerator.programs():
+            out.write(source + "\n")
+            out.flush()
+    except BrokenPipeError:
+        # The reader (e.g. head) has exited. Point stdout at devnull so that
+        # flushing it at exit does not raise again, and stop quietly.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, out.fileno())
+        sys.exit(1)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main(parse_args(sys.argv[1:]))
@@ -0,0 +1,396 @@
+"""
+A static pre-check of whether a program can reach a minimum output variance.
+
+A forward pass over the instructions of a program (the opposite direction of
+propagate_constraints) bounds the values each register can hold, given the
+values the samplers draw for the inputs. An int or bool register holds a Values
+(an interval, plus the exact set while it is small), a list register a Lists
+(the Values of its items and a range of lengths), and None stands for an
+unknown value. Instructions are interpreted by calling the DSL functions on
+every combination of argument values when there are few enough, so only list
+functions (and the lambdas of SCANL1) need rules of their own.
+
+    output = analyze_output(language, program, ranges, min_len, max_len)
+    reason = infeasibility_reason(output, min_variance)
+"""
+
+from collections import namedtuple
+from itertools import product
+
+from iogen.batch import Fallback, null_value
+from iogen.compiler import parse_source
+
+# Sets of values larger than this are kept as intervals only.
+MAX_VALUES = 4096
+# Functions are not evaluated on more combinations of argument values than this.
+MAX_PRODUCT = 1 << 16
+
+
+class Values(object):
+    """
+    The ints (or bools) a register can hold: values between low and high
+    (inclusive), and exactly the values in values unless it is None.
+    """
+
+    def __init__(self, low, high, values=None):
+        self.low = low
+        self.high = high
+        self.values = values
+
+    @classmethod
+    def of(cls, values):
+        values = frozenset(values)
+        if not values:
+            return None
+        low, high = min(values), max(values)
+        return cls(low, high, values if len(values) <= MAX_VALUES else None)
+
+    def size(self):
+        if self.values is not None:
+            return len(self.values)
+        return self.high - self.low + 1
+
+    def members(self):
+        """The values, or None if there are too many to enumerate."""
+        if self.values is not None:
+            return self.values
+        if self.size() <= MAX_VALUES:
+            return range(self.low, self.high + 1)
+        return None
+
+
+class Lists(object):
+    """
+    The lists a register can hold: items in items (a Values, or None if
+    unknown) and lengths between min_len and max_len (inclusive).
+    """
+
+    def __init__(self, items, min_len, max_len):
+        self.items = items
+        self.min_len = min_len
+        self.max_len = max_len
+
+
+OutputBounds = namedtuple("OutputBounds", ["low", "high", "cardinality"])
+
+
+def join(parts):
+    """The union of Values, or None if any of them is unknown (or there are none)."""
+    if not parts or any(p is None for p in parts):
+        return None
+    if all(p.values is not None for p in parts):
+        return Values.of(v for p in parts for v in p.values)
+    return Values(min(p.low for p in parts), max(p.high for p in parts))
+
+
+def apply(fun, args):
+    """The Values of fun over every combination of values of args, if feasible."""
+    if any(a is None for a in args):
+        return None
+    members = [a.members() for a in args]
+    if any(m is None for m in members):
+        return None
+    combinations = 1
+    for m in members:
+        combinations *= len(m)
+    if combinations > MAX_PRODUCT:
+        return None
+    return Values.of(fun(*combination) for combination in product(*members))
+
+
+def null(func):
+    """The Values of a function's Null, or an empty list if it has none."""
+    try:
+        return [Values.of([null_value(func)])]
+    except Fallback:
+        return []
+
+
+def element(func, xs):
+    # head, last, min and max
+    parts = [xs.items] if xs.max_len > 0 else []
+    if xs.min_len == 0:
+        parts += null(func)
+    return join(parts)
+
+
+def access(func, n, xs):
+    parts = [xs.items] if xs.max_len > 0 else []
+    if n is None or n.low < 0 or n.high >= xs.min_len:
+        parts += null(func)
+    return join(parts)
+
+
+def length(func, xs):
+    return Values(xs.min_len, xs.max_len)
+
+
+def count(func, n, xs):
+    if xs.max_len == 0:
+        return Values.of([0])
+    if n is not None and xs.items is not None:
+        ns, items = n.members(), xs.items.members()
+        if ns is not None and items is not None:
+            if not set(ns) & set(items):
+                return Values.of([0])
+            if len(ns) == 1 and set(ns) == set(items):
+                return Values(xs.min_len, xs.max_len)
+    return Values(0, xs.max_len)
+
+
+def list_sum(func, xs):
+    if xs.max_len == 0:
+        return Values.of([0])
+    if xs.items is None:
+        return None
+    return Values(
+        min(xs.items.low * xs.min_len, xs.items.low * xs.max_len),
+        max(xs.items.high * xs.min_len, xs.items.high * xs.max_len),
+    )
+
+
+def tail(func, xs):
+    if xs.min_len == 0:
+        # Null, an int, for an empty list
+        return None
+    return Lists(xs.items, xs.min_len - 1, xs.max_len - 1)
+
+
+def same(func, xs):
+    # reverse and sort
+    return xs
+
+
+def unique(func, xs):
+    max_len = xs.max_len
+    if xs.items is not None:
+        max_len = min(max_len, xs.items.size())
+    return Lists(xs.items, min(xs.min_len, 1), max_len)
+
+
+def take(func, n, xs):
+    if n is None or n.low < 0:
+        return Lists(xs.items, 0, xs.max_len)
+    return Lists(xs.items, min(xs.min_len, n.low), min(xs.max_len, n.high))
+
+
+def drop(func, n, xs):
+    if n is None or n.low < 0:
+        return Lists(xs.items, 0, xs.max_len)
+    return Lists(xs.items, max(xs.min_len - n.high, 0), max(xs.max_len - n.low, 0))
+
+
+def kept_items(func, args, xs):
+    """
+    For a filter-like function (called as func.fun(*args, [x])), the Values of
+    the items it keeps and whether it may drop any, or None if unknown.
+    """
+    if xs.items is None or any(a is None for a in args):
+        return None
+    members = [a.members() for a in args] + [xs.items.members()]
+    if any(m is None for m in members):
+        return None
+    kept = set()
+    drops = False
+    for combination in product(*members):
+        if func.fun(*combination[:-1], [combination[-1]]):
+            kept.add(combination[-1])
+        else:
+            drops = True
+    return Values.of(kept), drops
+
+
+def filter_kernel(func, *args):
+    xs = args[-1]
+    if xs.max_len == 0:
+        return xs
+    result = kept_items(func, args[:-1], xs)
+    if result is None:
+        return Lists(xs.items, 0, xs.max_len)
+    items, drops = result
+    if items is None:
+        return Lists(xs.items, 0, 0)
+    return Lists(items, 0 if drops else xs.min_len, xs.max_len)
+
+
+def count_kernel(func, xs):
+    if xs.max_len == 0:
+        return Values.of([0])
+    result = kept_items(func, [], xs)
+    if result is None:
+        return Values(0, xs.max_len)
+    items, drops = result
+    if items is None:
+        return Values.of([0])
+    return Values(0 if drops else xs.min_len, xs.max_len)
+
+
+def map_kernel(func, *args):
+    xs = args[-1]
+    items = apply(
+        lambda *a: func.fun(*a[:-1], [a[-1]])[0], list(args[:-1]) + [xs.items]
+    )
+    return Lists(items, xs.min_len, xs.max_len)
+
+
+def zipwith_kernel(func, xs, ys):
+    items = apply(lambda x, y: func.fun([x], [y])[0], [xs.items, ys.items])
+    return Lists(items, min(xs.min_len, ys.min_len), min(xs.max_len, ys.max_len))
+
+
+def scanl1_kernel(lambda_src):
+    def kernel(func, xs):
+        items = xs.items
+        if lambda_src in ("MIN", "MAX"):
+            return xs
+        if items is None or lambda_src not in ("+", "-"):
+            return Lists(None, xs.min_len, xs.max_len)
+        # Prefixes have up to k = max_len - 1 items after the first, which are
+        # added (+) or subtracted (-)
+        k = max(xs.max_len - 1, 0)
+        if lambda_src == "+":
+            low = min(items.low, items.low + k * items.low)
+            high = max(items.high, items.high + k * items.high)
+        else:
+            low = min(items.low, items.low - k * items.high)
+            high = max(items.high, items.high - k * items.low)
+        return Lists(Values(low, high), xs.min_len, xs.max_len)
+
+    return kernel
+
+
+def elementwise_kernel(func, *args):
+    values = apply(func.fun, args)
+    if values is None and func.sig[-1] == bool:
+        return Values.of([False, True])
+    return values
+
+
+KERNELS = {
+    "head": element,
+    "HEAD": element,
+    "last": element,
+    "LAST": element,
+    "max": element,
+    "MAXIMUM": element,
+    "min": element,
+    "MINIMUM": element,
+    "index": access,
+    "ACCESS": access,
+    "len": length,
+    "LEN": length,
+    "count": count,
+    "COUNT": count,
+    "sum": list_sum,
+    "SUM": list_sum,
+    "tail": tail,
+    "TAIL": tail,
+    "reverse": same,
+    "REVERSE": same,
+    "sort": same,
+    "SORT": same,
+    "unique": unique,
+    "TAKE": take,
+    "DROP": drop,
+}
+
+
+def get_kernel(func):
+    """
+    Returns the abstract kernel of a DSL function, called as kernel(func, *args)
+    with a Values or Lists (or None) per argument, or None if it has none.
+    """
+    src = func.src
+    if src in KERNELS:
+        return KERNELS[src]
+    if all(t == int for t in func.sig[:-1]) and func.sig[-1] in (int, bool):
+        return elementwise_kernel
+    if src.startswith("map(") or src.startswith("MAP "):
+        return map_kernel
+    if src.startswith("filter(") or src.startswith("FILTER "):
+        return filter_kernel
+    command, _, lambda_src = src.partition(" ")
+    if command == "COUNT":
+        return count_kernel
+    if command == "ZIPWITH":
+        return zipwith_kernel
+    if command == "SCANL1":
+        return scanl1_kernel(lambda_src)
+    return None
+
+
+def analyze_output(language, program, ranges, min_len=1, max_len=10):
+    """
+    Returns the values the output of a program can take (a Values, a Lists or
+    None), for inputs drawn like the samplers do: each int argument in its range
+    of ranges (half-open, see sampled_range) and each list argument with a length
+    in range(min_len, max_len) and items in its range.
+    """
+    functions, input_types, pointers, types = parse_source(language, program.src)
+    registers = []
+    for (t, (low, high)) in zip(input_types, ranges):
+        if high <= low:
+            return None
+        values = Values(low, high - 1)
+        if t == [int]:
+            registers.append(Lists(values, min_len, max_len - 1))
+        else:
+            registers.append(values)
+    for t in range(len(input_types), len(types)):
+        args = [registers[p] for p in pointers[t]]
+        kernel = get_kernel(functions[t])
+        value = None
+        if kernel is not None and not any(
+            a is None and types[p] == [int] for (a, p) in zip(args, pointers[t])
+        ):
+            value = kernel(functions[t], *args)
+        registers.append(value)
+    return registers[-1]
+
+
+def output_bounds(output):
+    """
+    Bounds on the values outputs contribute to the output variance (see
+    output_stat): an OutputBounds, with a cardinality of None if it is unknown,
+    or None if the output is unknown or always an empty list.
+    """
+    if output is None:
+        return None
+    if isinstance(output, Lists):
+        if output.max_len == 0 or output.items is None:
+            return None
+        items = output.items
+        sums = list_sum(None, output)
+        cardinality = None
+        if items.size() == 1 and output.min_len == output.max_len:
+            cardinality = 1
+        return OutputBounds(sums.low, sums.high, cardinality)
+    return OutputBounds(int(output.low), int(output.high), output.size())
+
+
+def max_variance(bounds):
+    """The highest (population) variance of values between the bounds."""
+    return (bounds.high - bounds.low) ** 2 / 4.0
+
+
+def infeasibility_reason(output, min_variance):
+    """
+    Returns why outputs in output (see analyze_output) can never have a variance
+    of at least min_variance, or None if they might.
+    """
+    if isinstance(output, Lists) and output.max_len == 0:
+        return "the output is always an empty list"
+    bounds = output_bounds(output)
+    if bounds is None:
+        return None
+    if bounds.low == bounds.high:
+        if not isinstance(output, Lists):
+            return "the output is always {}".format(bounds.low)
+        if bounds.cardinality == 1:
+            return "the output is always the same list"
+        return "the output always sums to {}".format(bounds.low)
+    if max_variance(bounds) < min_variance:
+        return "outputs between {} and {} have a variance of at most {:g}".format(
+            bounds.low, bounds.high, max_variance(bounds)
+        )
+    return None
@@ -0,0 +1,81 @@
+import hashlib
+
+from iogen.trie import ExecutionError
+
+# Stands in for the output of a program that raised on a probe input.
+ERROR = "!error"
+
+DEFAULT_NUM_PROBES = 32
+
+# Share of probe values drawn from the small values under SMALL_MAX, which (like
+# the biased sampling in iogen.io) makes collisions such as "count b a" > 0 likely.
+SMALL_MAX = 10
+SMALL_AMOUNT = 0.85
+
+
+def probe_inputs(
+    input_types,
+    num_probes=DEFAULT_NUM_PROBES,
+    min_value=0,
+    max_value=10,
+    min_len=1,
+    max_len=10,
+    seed=0,
+    bounds=None,
+):
+    """
+    A fixed, seeded set of inputs used to compare programs by their outputs.
+    Ints are drawn from range(min_value, max_value), or from range(*bounds[a])
+    for argument a if bounds are given, mostly from values under SMALL_MAX; list
+    lengths cycle through range(min_len, max_len), so every length is covered.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    if bounds is None:
+        bounds = [(min_value, max_value)] * len(input_types)
+
+    def draw(low, high, size=None):
+        values = rng.integers(low, high, size=size)
+        small_max = min(high, SMALL_MAX)
+        if small_max <= low:
+            return values
+        small = rng.integers(low, small_max, size=size)
+        return np.where(rng.random(size) < SMALL_AMOUNT, small, values)
+
+    lengths = list(range(min_len, max(max_len, min_len + 1)))
+    probes = []
+    for i in range(num_probes):
+        args = []
+        for (t, (low, high)) in zip(input_types, bounds):
+            if t == int:
+                args.append(int(draw(low, high)))
+            elif t == [int]:
+                length = lengths[i % len(lengths)]
+                args.append(draw(low, high, length).tolist())
+            else:
+                raise ValueError("Unsupported input type ({})".format(t))
+        probes.append(args)
+    return probes
+
+
+def run_on_probes(fun, probes):
+    """Outputs of a program on each probe, with ERROR for probes that raised."""
+    outputs = []
+    for args in probes:
+        try:
+            outputs.append(fun(args))
+        except Exception:
+            outputs.append(ERROR)
+    return outputs
+
+
+def program_fingerprint(program, probes):
+    """Fingerprint of a compiled Program, run with its executor on the probes."""
+    return fingerprint(run_on_probes(program.fun, probes))
+
+
+def fingerprint(outputs):
+    """Hash of a program's outputs on the probe inputs."""
+    outputs = [ERROR if isinstance(o, ExecutionError) else o for o in outputs]
+    return hashlib.sha1(repr(outputs).encode("utf-8")).hexdigest()
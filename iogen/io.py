@@ -1,12 +1,18 @@
-import random
 import time
 from collections import Counter
+from functools import lru_cache
+from math import gcd
 
 import numpy as np
 from tqdm import tqdm
 
+from iogen.batch import ListBatch, to_python
 from iogen.compiler import compile_program
 from iogen.constraints import is_int
+from iogen.feasibility import analyze_output, infeasibility_reason
+from iogen.metrics import Metrics
+from iogen.pool import IOPool, StratifiedPool, output_key, output_stat
+from iogen.trie import ExecutionError, ProgramTrie
 
 
 def get_inputs(io_pairs):
@@ -46,8 +52,25 @@ def is_interesting(io_pairs, min_variance):
 BIAS_MAX = 10
 BIAS_AMOUNT = 0.98
 
+# Adaptive batches double while fewer than this share of a round's samples are
+# kept in the pool, up to MAX_BATCH_SIZE samples per round.
+LOW_ACCEPTANCE = 0.2
+MAX_BATCH_SIZE = 1024
 
-def biased_randint(minv, maxv, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT):
+# Used by the samplers when they are not given a numpy.random.Generator.
+_default_rng = np.random.default_rng()
+
+
+def get_rng(rng=None):
+    """
+    Returns rng, or the module's default Generator if rng is None. Samplers take
+    an optional rng, so that callers that pass a seeded Generator get the same
+    samples on every run.
+    """
+    return _default_rng if rng is None else rng
+
+
+def biased_randint(minv, maxv, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT, rng=None):
     """
     Biases random selection for numbers under bias_max in range(minv, maxv).
 
@@ -72,15 +95,11 @@ def biased_randint(minv, maxv, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT):
         bias=0.98:  0.84718
         bias=0.99:  0.9166199999999999
     """
-    if maxv <= bias_max or minv >= bias_max:
-        return np.random.randint(minv, maxv)
-    probs = get_biased_probabilities(minv, maxv, bias_max, bias_amount)
-    res = np.random.multinomial(1, probs)
-    return np.argmax(res).item()
+    return get_biased_sampler(minv, maxv, bias_max, bias_amount).sample(rng)
 
 
 def biased_randint_list(
-    minv, maxv, array_size, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT
+    minv, maxv, array_size, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT, rng=None
 ):
     """
     Similar to biased_randint but for lists of ints.
@@ -103,16 +122,58 @@ def biased_randint_list(
         bias=0.98:  0.8470199999999999
         bias=0.99:  0.9174999999999999
     """
-    if maxv <= bias_max or minv >= bias_max:
-        return [i.item() for i in np.random.randint(minv, maxv, size=array_size)]
-    probs = get_biased_probabilities(minv, maxv, bias_max, bias_amount)
-    res = np.random.multinomial(array_size, probs, size=1)
-    vals = []
-    for (i, v) in enumerate(res[0]):
-        for j in range(v):
-            vals.append(i)
-    random.shuffle(vals)
-    return vals
+    sampler = get_biased_sampler(minv, maxv, bias_max, bias_amount)
+    return sampler.sample_array(array_size, rng).tolist()
+
+
+class BiasedSampler(object):
+    """
+    Draws ints from range(minv, maxv) with the same distribution as
+    get_biased_probabilities, without building a probability per value.
+
+    The biased distribution is piecewise uniform (every value under bias_max has
+    weight bias_amount, every other value has weight 1 - bias_amount), so it is
+    stored as a CDF table over at most two segments. A draw picks a segment and
+    then a uniform value within it, which is O(1) per value for any maxv.
+    """
+
+    def __init__(self, minv, maxv, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT):
+        if maxv <= bias_max or minv >= bias_max:
+            segments = [(minv, maxv, 1.0)]
+        else:
+            # get_biased_probabilities only assigns weight to values in range(maxv)
+            low = max(minv, 0)
+            segments = [
+                (low, bias_max, bias_amount * (bias_max - low)),
+                (bias_max, maxv, (1.0 - bias_amount) * (maxv - bias_max)),
+            ]
+        self.lows = np.array([l for (l, _, _) in segments])
+        self.highs = np.array([h for (_, h, _) in segments])
+        weights = np.array([w for (_, _, w) in segments])
+        self.cdf = np.cumsum(weights) / weights.sum()
+
+    def _segments(self, size, rng):
+        if len(self.cdf) == 1:
+            return 0
+        u = rng.random(size)
+        return np.minimum(np.searchsorted(self.cdf, u, side="right"), len(self.cdf) - 1)
+
+    def sample(self, rng=None):
+        rng = get_rng(rng)
+        s = self._segments(None, rng)
+        return int(rng.integers(self.lows[s], self.highs[s]))
+
+    def sample_array(self, size, rng=None):
+        rng = get_rng(rng)
+        s = self._segments(size, rng)
+        if len(self.cdf) == 1:
+            return rng.integers(self.lows[s], self.highs[s], size=size)
+        return rng.integers(self.lows[s], self.highs[s])
+
+
+@lru_cache(maxsize=1024)
+def get_biased_sampler(minv, maxv, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT):
+    return BiasedSampler(minv, maxv, bias_max, bias_amount)
 
 
 def get_biased_probabilities(minv, maxv, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT):
@@ -128,41 +189,397 @@ def get_biased_probabilities(minv, maxv, bias_max=BIAS_MAX, bias_amount=BIAS_AMO
     return [i / s for i in probs]
 
 
+def biased_randint_array(
+    minv, maxv, array_size, bias_max=BIAS_MAX, bias_amount=BIAS_AMOUNT, rng=None
+):
+    """
+    Similar to biased_randint_list, but draws all values in a single NumPy call
+    and returns them as an integer array (in random order).
+    """
+    sampler = get_biased_sampler(minv, maxv, bias_max, bias_amount)
+    return sampler.sample_array(array_size, rng)
+
+
+def sample_input_columns(program, num_examples, min_len=1, max_len=10, rng=None):
+    """
+    Draws the inputs for num_examples examples column by column, as arrays: all
+    scalar ints for an argument are drawn into an int array, and all list lengths
+    and list items for an argument into a ListBatch, with a few NumPy calls and
+    without building a Python object per value.
+    """
+    rng = get_rng(rng)
+    columns = []
+    for (a, input_type) in enumerate(program.ins):
+        minv, maxv = program.bounds[a]
+        if input_type == int:
+            column = biased_randint_array(minv, maxv, num_examples, rng=rng)
+        elif input_type == [int]:
+            sizes = rng.integers(min_len, max_len, size=num_examples)
+            items = biased_randint_array(minv, maxv, sizes.sum(), rng=rng)
+            column = ListBatch.from_items(items, sizes)
+        else:
+            raise Exception(
+                "Unsupported input type "
+                + str(input_type)
+                + " for random input generation"
+            )
+        columns.append(column)
+    return columns
+
+
+def columns_to_inputs(columns):
+    """ Converts batched input columns to a list of per-example inputs. """
+    return [list(row) for row in zip(*[to_python(c) for c in columns])]
+
+
+class ArrayInput(object):
+    """
+    The input of one example in batched input columns, kept as a reference into
+    the arrays until it is converted to Python values with tolist.
+    """
+
+    __slots__ = ("columns", "index")
+
+    def __init__(self, columns, index):
+        self.columns = columns
+        self.index = index
+
+    def tolist(self):
+        values = []
+        for column in self.columns:
+            if isinstance(column, ListBatch):
+                length = column.lengths[self.index]
+                values.append(column.data[self.index, :length].tolist())
+            else:
+                values.append(column[self.index].item())
+        return values
+
+
+def input_to_list(input_value):
+    if isinstance(input_value, ArrayInput):
+        return input_value.tolist()
+    return input_value
+
+
+def sample_inputs_batched(program, num_examples, min_len=1, max_len=10, rng=None):
+    """
+    Draws the inputs for num_examples examples with sample_input_columns, and
+    splits them into per-example inputs.
+    """
+    if num_examples <= 0:
+        return []
+    return columns_to_inputs(
+        sample_input_columns(program, num_examples, min_len, max_len, rng)
+    )
+
+
 def generate_io_pairs(
-    program, num_examples, max_bound, min_len=1, max_len=10
+    program, num_examples, max_bound, min_len=1, max_len=10, batched=False, rng=None
 ):  # TODO: allow empty lists
     """
     Given a program, randomly generates N input-output examples according to constraints.
     If an argument type or value in an argument is an integer, pick a random int within bounds.
     If an argument type is a list, randomize the list length according to min/max parameters.
+    If batched is set, inputs for all N examples are sampled at once (see sample_inputs_batched).
     """
+    if batched:
+        inputs = sample_inputs_batched(program, num_examples, min_len, max_len, rng)
+    else:
+        inputs = sample_inputs(program, num_examples, min_len, max_len, rng)
+    return get_io_pairs(program, inputs, max_bound)
+
+
+def get_io_pairs(program, inputs, max_bound):
+    """ Runs a program on a list of inputs and returns the IO pairs. """
+    return pair_outputs(program, inputs, program.fun.run_batch(inputs), max_bound)
+
+
+def get_io_pairs_from_columns(program, columns, max_bound):
+    """
+    Like get_io_pairs, for inputs batched by sample_input_columns. The program
+    (compiled with the "numpy" backend) runs on the arrays directly. Outputs are
+    converted to Python values, but inputs are ArrayInputs (see input_to_list),
+    so only the inputs of the pairs that are kept are ever converted.
+    """
+    if not columns or len(columns[0]) == 0:
+        return []
+    outputs = to_python(program.fun.run_columns(columns))
+    inputs = [ArrayInput(columns, i) for i in range(len(outputs))]
+    return pair_outputs(program, inputs, outputs, max_bound)
+
+
+def pair_outputs(program, inputs, outputs, max_bound):
+    io_pairs = []
+    for (input_value, output_value) in zip(inputs, outputs):
+        io_pairs.append((input_value, output_value))
+        assert (
+            (program.out == int and output_value <= max_bound)
+            or (program.out == [int] and len(output_value) == 0)
+            or (program.out == [int] and max(output_value) <= max_bound)
+            or program.out == bool
+        )
+    return io_pairs
+
+
+def sample_inputs(program, num_examples, min_len=1, max_len=10, rng=None):
+    rng = get_rng(rng)
     input_types = program.ins
     input_nargs = len(input_types)
-    io_pairs = []
+    inputs = []
     for _ in range(num_examples):
         input_value = [None] * input_nargs
         for a in range(input_nargs):
             minv, maxv = program.bounds[a]
             if input_types[a] == int:
-                input_value[a] = biased_randint(minv, maxv)
+                input_value[a] = biased_randint(minv, maxv, rng=rng)
             elif input_types[a] == [int]:
-                array_size = np.random.randint(min_len, max_len)
-                input_value[a] = biased_randint_list(minv, maxv, array_size)
+                array_size = rng.integers(min_len, max_len)
+                input_value[a] = biased_randint_list(minv, maxv, array_size, rng=rng)
             else:
                 raise Exception(
                     "Unsupported input type "
-                    + input_types[a]
+                    + str(input_types[a])
                     + " for random input generation"
                 )
-        output_value = program.fun(input_value)
-        io_pairs.append((input_value, output_value))
-        assert (
-            (program.out == int and output_value <= max_bound)
-            or (program.out == [int] and len(output_value) == 0)
-            or (program.out == [int] and max(output_value) <= max_bound)
-            or program.out == bool
-        )
-    return io_pairs
+        inputs.append(input_value)
+    return inputs
+
+
+def mutate_input(program, input_value, min_len=1, max_len=10, rng=None):
+    """
+    Returns a copy of an input with one argument slightly changed, staying within
+    the program's input bounds and the list lengths drawn by sample_inputs. A list
+    argument has an item duplicated, dropped, copied over another item or
+    resampled; an int argument is resampled or set to an item of a list argument.
+    """
+    rng = get_rng(rng)
+    input_value = [list(v) if isinstance(v, list) else v for v in input_value]
+    a = rng.integers(len(input_value))
+    minv, maxv = program.bounds[a]
+    v = input_value[a]
+    if program.ins[a] == [int]:
+        mutations = ["resample"]
+        if v:
+            mutations.append("copy")
+            if len(v) < max_len - 1:
+                mutations.append("duplicate")
+        if len(v) > min_len:
+            mutations.append("drop")
+        mutation = mutations[rng.integers(len(mutations))]
+        if mutation == "duplicate":
+            v.insert(rng.integers(len(v) + 1), v[rng.integers(len(v))])
+        elif mutation == "drop":
+            v.pop(rng.integers(len(v)))
+        elif mutation == "copy":
+            v[rng.integers(len(v))] = v[rng.integers(len(v))]
+        elif v:
+            v[rng.integers(len(v))] = biased_randint(minv, maxv, rng=rng)
+        else:
+            v.append(biased_randint(minv, maxv, rng=rng))
+    else:
+        items = [
+            i
+            for (t, w) in zip(program.ins, input_value)
+            if t == [int]
+            for i in w
+            if minv <= i < maxv
+        ]
+        if items and rng.integers(2):
+            input_value[a] = items[rng.integers(len(items))]
+        else:
+            input_value[a] = biased_randint(minv, maxv, rng=rng)
+    return input_value
+
+
+def sample_inputs_stratified(
+    program, pool, num_examples, min_len=1, max_len=10, batched=False, rng=None
+):
+    """
+    Draws half of the inputs fresh, and the other half as mutations (see
+    mutate_input) of the inputs of pairs in the pool, picking a bucket of the
+    StratifiedPool uniformly. Rare outputs are as likely to be mutated as common
+    ones, so samples tend to land in the neighbouring, underrepresented buckets.
+    """
+    rng = get_rng(rng)
+    parents = pool.bucket_pairs()
+    num_mutants = num_examples // 2 if parents else 0
+    sample = sample_inputs_batched if batched else sample_inputs
+    inputs = sample(program, num_examples - num_mutants, min_len, max_len, rng)
+    for _ in range(num_mutants):
+        parent = parents[rng.integers(len(parents))][0]
+        inputs.append(mutate_input(program, parent, min_len, max_len, rng))
+    return inputs
+
+
+def next_batch_size(batch_size, accepted, num_examples):
+    """
+    Batch size for the next round of adaptive sampling: doubled when few of the
+    last batch's pairs were accepted into the pool, otherwise halved, but never
+    below num_examples.
+    """
+    if accepted < LOW_ACCEPTANCE * batch_size:
+        return max(min(batch_size * 2, MAX_BATCH_SIZE), num_examples)
+    return max(batch_size // 2, num_examples)
+
+
+def add_to_pool(pool, io_pairs):
+    """ Adds a round of pairs to a pool and returns how many of them were kept. """
+    evicted = set(id(pair) for pair in pool.extend(io_pairs))
+    return sum(1 for pair in io_pairs if id(pair) not in evicted)
+
+
+def sampled_range(minv, maxv):
+    """ The range of values drawn by biased sampling from range(minv, maxv). """
+    sampler = get_biased_sampler(minv, maxv)
+    return int(sampler.lows[0]), int(sampler.highs[-1])
+
+
+class InputSpace(object):
+    """
+    Every input that the samplers can draw for a program: each int argument in
+    its sampled_range, and each list argument with a length in range(min_len,
+    max_len) and items in its sampled_range. Inputs are numbered from 0 to size
+    - 1, with the arguments as the digits of a mixed-radix number, so a shuffled
+    range of indices (see ShuffledRange) enumerates the inputs in random order
+    without repeats.
+    """
+
+    def __init__(self, program, min_len=1, max_len=10):
+        self.input_types = list(program.ins)
+        self.ranges = [sampled_range(minv, maxv) for (minv, maxv) in program.bounds]
+        self.lengths = list(range(min_len, max_len))
+        self.sizes = []
+        for (t, (low, high)) in zip(self.input_types, self.ranges):
+            if t == int:
+                self.sizes.append(high - low)
+            elif t == [int]:
+                self.sizes.append(sum((high - low) ** l for l in self.lengths))
+            else:
+                raise Exception(
+                    "Unsupported input type " + str(t) + " for input enumeration"
+                )
+        self.size = 1
+        for size in self.sizes:
+            self.size *= size
+
+    def decode(self, indices):
+        """ The inputs with the given indices, as columns (see sample_input_columns). """
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = []
+        for (t, (low, high), size) in zip(self.input_types, self.ranges, self.sizes):
+            k = indices % size
+            indices = indices // size
+            if t == int:
+                columns.append(low + k)
+                continue
+            # k numbers a list: first by its length, then by its items as base r digits
+            r = high - low
+            counts = np.array([r ** l for l in self.lengths], dtype=np.int64)
+            ends = np.cumsum(counts)
+            length_index = np.searchsorted(ends, k, side="right")
+            k = k - (ends - counts)[length_index]
+            lengths = np.array(self.lengths, dtype=np.int64)[length_index]
+            width = max(self.lengths)
+            powers = np.array([r ** j for j in range(width)], dtype=np.int64)
+            data = low + (k[:, None] // powers) % max(r, 1)
+            columns.append(ListBatch.from_padded(data, lengths))
+        return columns
+
+
+class ShuffledRange(object):
+    """
+    The numbers in range(size) in a random order, as the affine map i -> (a * i +
+    b) % size for a random a coprime to size. Slices are computed when they are
+    taken, so enumerating a range does not build a permutation of size numbers.
+    """
+
+    def __init__(self, size, rng=None):
+        rng = get_rng(rng)
+        self.size = size
+        self.a = 1
+        if size > 2:
+            self.a = int(rng.integers(1, size))
+            while gcd(self.a, size) != 1:
+                self.a = int(rng.integers(1, size))
+        self.b = int(rng.integers(size)) if size > 0 else 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        start, stop, step = index.indices(self.size)
+        i = np.arange(start, stop, step, dtype=np.int64)
+        if self.size >= 1 << 31:
+            # a * i would overflow int64
+            i = i.astype(object)
+        return (self.a * i + self.b) % self.size
+
+
+def keep_spread_pairs(by_key, io_pairs, num_examples):
+    """
+    Adds io_pairs to by_key (output key -> IO pairs), keeping the first
+    num_examples pairs of each output, which are all that select_spread reads.
+    """
+    for pair in io_pairs:
+        pairs = by_key.setdefault(output_key(pair[1]), [])
+        if len(pairs) < num_examples:
+            pairs.append(pair)
+
+
+def get_input_space(program, min_len, max_len, threshold):
+    """ Returns the InputSpace of a program if it has at most threshold inputs. """
+    space = InputSpace(program, min_len, max_len)
+    return space if space.size <= threshold else None
+
+
+def check_feasibility(language, program, min_variance, min_len=1, max_len=10):
+    """
+    Returns why the outputs of a program can never reach min_variance on the
+    inputs the samplers draw (see iogen.feasibility), or None if they might.
+    """
+    ranges = [sampled_range(minv, maxv) for (minv, maxv) in program.bounds]
+    output = analyze_output(language, program, ranges, min_len, max_len)
+    return infeasibility_reason(output, min_variance)
+
+
+def select_spread(io_pairs, num_examples, min_variance):
+    """
+    Chooses num_examples pairs from every IO pair of a program. Distinct outputs
+    are ranked alternately from the lowest and highest (by output_stat), and the
+    pairs are taken round-robin from the j first outputs, with the largest j for
+    which the pairs are interesting, or else the j with the highest variance. So
+    the choice keeps as many distinct outputs as min_variance allows.
+    """
+    by_key = {}
+    for pair in io_pairs:
+        by_key.setdefault(output_key(pair[1]), []).append(pair)
+    keys = sorted(by_key, key=lambda k: output_stat(by_key[k][0][1]))
+    order = []
+    while keys:
+        order.append(keys.pop(0))
+        if keys:
+            order.append(keys.pop())
+
+    def pick(j):
+        chosen = []
+        for keys in (order[:j], order[j:]):
+            depth = 0
+            while len(chosen) < num_examples and keys:
+                keys = [k for k in keys if depth < len(by_key[k])]
+                for k in keys[: num_examples - len(chosen)]:
+                    chosen.append(by_key[k][depth])
+                depth += 1
+        return chosen
+
+    best, best_variance = [], None
+    for j in range(min(len(order), num_examples), 0, -1):
+        chosen = pick(j)
+        variance = get_output_variance(get_outputs(chosen))
+        if variance is not None and variance >= min_variance:
+            return chosen
+        if variance is not None and (best_variance is None or variance > best_variance):
+            best, best_variance = chosen, variance
+    return best or pick(len(order))
 
 
 def generate_interesting(
@@ -176,49 +593,139 @@ def generate_interesting(
     min_variance=1.0,
     timeout=5.0,
     min_bound=None,
+    batched=False,
+    show_progress=True,
+    backend="interpreter",
+    stratified=False,
+    max_samples=None,
+    adaptive_batch=False,
+    rng=None,
+    program=None,
+    array_values=False,
+    exhaustive_threshold=None,
+    precheck=None,
 ):
     """
     Compile a program and generates interesting IO pairs.
+    If stratified is set, IO pairs are kept in a StratifiedPool and inputs are
+    partly sampled by mutating inputs from its buckets (see sample_inputs_stratified).
+    Sampling stops after timeout seconds (unless timeout is None), or after
+    max_samples samples. With adaptive_batch, each round samples a batch sized by
+    next_batch_size instead of num_examples.
+    Inputs are drawn from rng, a numpy.random.Generator (default: a new unseeded
+    Generator), so a seeded rng and max_samples reproduce the same IO pairs.
+    A program already compiled from source with the same bounds can be passed as
+    program, to skip compiling it again.
+    With array_values, inputs are sampled as arrays (see sample_input_columns) and
+    the program is compiled with the "numpy" backend and run on them directly;
+    stratified sampling still mutates inputs as Python lists.
+    If exhaustive_threshold is set and the program has at most that many inputs
+    (see InputSpace), every input is enumerated in a random order instead of
+    sampled, without repeats and without stratified mutation. If all of them are
+    run without the pool becoming interesting, the examples are chosen from every
+    IO pair with select_spread.
+    If precheck is "fast" or "reject", programs whose outputs can never reach
+    min_variance (see check_feasibility) only sample a single round, or none at
+    all, and the reason is returned as "infeasible".
     Returns output as a dictionary.
     """
     t = time.time()
+    if array_values:
+        backend = "numpy"
+    if rng is None:
+        rng = np.random.default_rng()
+    metrics = Metrics()
     source = source.replace(" | ", "\n")
-    program = compile_program(
-        language,
-        source,
-        min_bound=min_bound,
-        max_bound=max_bound,
-        max_list_item_val=maxv,
-    )
+    if program is None:
+        with metrics.timer("compile"):
+            program = compile_program(
+                language,
+                source,
+                min_bound=min_bound,
+                max_bound=max_bound,
+                max_list_item_val=maxv,
+                backend=backend,
+            )
+
+    infeasible = None
+    if precheck is not None:
+        with metrics.timer("precheck"):
+            infeasible = check_feasibility(
+                language, program, min_variance, min_io_len, max_io_len
+            )
 
     interesting = False
     hit_timeout = False
-    io_pairs = []
+    hit_max_samples = False
+    exhausted = False
+    stopped = infeasible is not None and precheck == "reject"
+    pool = StratifiedPool(num_examples) if stratified else IOPool(num_examples)
+    space = None
+    if exhaustive_threshold is not None:
+        space = get_input_space(program, min_io_len, max_io_len, exhaustive_threshold)
+    if space is not None:
+        order = ShuffledRange(space.size, rng)
+        spread_pairs = {}
 
     elapsed = time.time() - t
-    tqdm.write("program: {}".format(source.replace("\n", " | ")))
-    pbar = tqdm(total=timeout, desc="IO For Program", unit="sec")
+    if show_progress:
+        tqdm.write("program: {}".format(source.replace("\n", " | ")))
+        if infeasible is not None:
+            tqdm.write("infeasible: {}".format(infeasible))
+    pbar = tqdm(
+        total=timeout, desc="IO For Program", unit="sec", disable=not show_progress
+    )
 
     samples = 0
+    batch_size = num_examples
     last_progress = 0
     last_elapsed = 0
+    sample = sample_inputs_batched if batched else sample_inputs
 
-    while not interesting and not hit_timeout:
-        latest_io_pairs = generate_io_pairs(
-            program,
-            num_examples=num_examples,
-            max_bound=max_bound,
-            min_len=min_io_len,
-            max_len=max_io_len,
-        )
+    while not (interesting or hit_timeout or hit_max_samples or exhausted or stopped):
+        if max_samples is not None:
+            batch_size = min(batch_size, max_samples - samples)
+        with metrics.timer("sampling"):
+            if space is not None:
+                columns = space.decode(order[samples : samples + batch_size])
+                if not array_values:
+                    inputs = columns_to_inputs(columns)
+            elif stratified:
+                inputs = sample_inputs_stratified(
+                    program, pool, batch_size, min_io_len, max_io_len, batched, rng
+                )
+            elif array_values:
+                columns = sample_input_columns(
+                    program, batch_size, min_io_len, max_io_len, rng
+                )
+            else:
+                inputs = sample(program, batch_size, min_io_len, max_io_len, rng)
+        with metrics.timer("execution"):
+            if array_values and (space is not None or not stratified):
+                latest_io_pairs = get_io_pairs_from_columns(program, columns, max_bound)
+            else:
+                latest_io_pairs = get_io_pairs(program, inputs, max_bound)
         samples += len(latest_io_pairs)
-        io_pairs.extend(latest_io_pairs)
-        io_pairs = reduce_io_pairs(io_pairs, num_examples)
-        if is_interesting(io_pairs, min_variance):
-            interesting = True
+        if space is not None:
+            keep_spread_pairs(spread_pairs, latest_io_pairs, num_examples)
+            exhausted = samples >= space.size
+        with metrics.timer("pool"):
+            accepted = add_to_pool(pool, latest_io_pairs)
+        with metrics.timer("interesting"):
+            if pool.is_interesting(min_variance):
+                interesting = True
+        metrics.count("rounds")
+        metrics.count("samples", len(latest_io_pairs))
+        metrics.count("accepted", accepted)
         elapsed = time.time() - t
-        if elapsed > timeout:
+        if timeout is not None and elapsed > timeout:
             hit_timeout = True
+        if max_samples is not None and samples >= max_samples and not interesting:
+            hit_max_samples = not exhausted
+        if adaptive_batch:
+            batch_size = next_batch_size(batch_size, accepted, num_examples)
+        # Infeasible programs are fast-tracked after a single round
+        stopped = infeasible is not None
 
         n = elapsed - last_elapsed
         last_elapsed = elapsed
@@ -229,11 +736,273 @@ def generate_interesting(
     pbar.update(100 - last_progress)
     pbar.close()
 
-    return format_examples(program, io_pairs, elapsed, timeout, hit_timeout, samples)
+    io_pairs = pool.pairs()
+    if exhausted and not interesting:
+        io_pairs = [pair for pairs in spread_pairs.values() for pair in pairs]
+        io_pairs = select_spread(io_pairs, num_examples, min_variance)
+    io_pairs = [(input_to_list(i), o) for (i, o) in io_pairs]
+    d = format_examples(
+        program,
+        io_pairs,
+        elapsed,
+        timeout,
+        hit_timeout,
+        samples,
+        hit_max_samples,
+        metrics,
+    )
+    if space is not None:
+        d["input_space_size"] = space.size
+        d["exhausted_inputs"] = exhausted
+    if infeasible is not None:
+        d["infeasible"] = infeasible
+    return d
+
+
+def generate_interesting_shared(language, sources, **kwargs):
+    """
+    Like generate_interesting, but for a corpus of programs (see
+    iter_interesting_shared). Returns a list of results in the order of sources.
+    """
+    results = [None] * len(sources)
+    for (index, d) in iter_interesting_shared(language, sources, **kwargs):
+        results[index] = d
+    return results
+
+
+def iter_interesting_shared(
+    language,
+    sources,
+    num_examples=5,
+    max_bound=512,
+    maxv=10,
+    min_io_len=1,
+    max_io_len=10,
+    min_variance=1.0,
+    timeout=5.0,
+    min_bound=None,
+    batched=False,
+    show_progress=True,
+    stratified=False,
+    max_samples=None,
+    adaptive_batch=False,
+    rng=None,
+    exhaustive_threshold=None,
+    precheck=None,
+):
+    """
+    Like generate_interesting, but for a corpus of programs. Programs with the same
+    input types and input bounds share sampled inputs and are executed together
+    with a ProgramTrie, so instruction prefixes common to several programs are
+    evaluated once per input. Each program stops when its IO pairs are interesting,
+    or when its group hits the timeout or max_samples. With exhaustive_threshold,
+    a group whose inputs are few enough enumerates them, and with precheck,
+    infeasible programs stop after one round or are not run (see
+    generate_interesting).
+    Yields (index in sources, result) pairs, group by group as each group finishes.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    sources = [source.replace(" | ", "\n") for source in sources]
+    programs = []
+    metrics = []
+    for source in sources:
+        metrics.append(Metrics())
+        with metrics[-1].timer("compile"):
+            programs.append(
+                compile_program(
+                    language,
+                    source,
+                    min_bound=min_bound,
+                    max_bound=max_bound,
+                    max_list_item_val=maxv,
+                )
+            )
+    groups = {}
+    for (index, program) in enumerate(programs):
+        key = (str(program.ins), str(program.bounds))
+        groups.setdefault(key, []).append(index)
+
+    for indices in groups.values():
+        group_results = generate_shared_group(
+            language,
+            [programs[i] for i in indices],
+            [metrics[i] for i in indices],
+            num_examples=num_examples,
+            max_bound=max_bound,
+            min_io_len=min_io_len,
+            max_io_len=max_io_len,
+            min_variance=min_variance,
+            timeout=timeout,
+            batched=batched,
+            show_progress=show_progress,
+            stratified=stratified,
+            max_samples=max_samples,
+            adaptive_batch=adaptive_batch,
+            rng=rng,
+            exhaustive_threshold=exhaustive_threshold,
+            precheck=precheck,
+        )
+        yield from zip(indices, group_results)
+
+
+def generate_shared_group(
+    language,
+    programs,
+    metrics,
+    num_examples,
+    max_bound,
+    min_io_len,
+    max_io_len,
+    min_variance,
+    timeout,
+    batched,
+    show_progress,
+    stratified=False,
+    max_samples=None,
+    adaptive_batch=False,
+    rng=None,
+    exhaustive_threshold=None,
+    precheck=None,
+):
+    t = time.time()
+    rng = get_rng(rng)
+    trie = ProgramTrie(language, [program.src for program in programs])
+    # programs in a group share their input bounds, and so their InputSpace
+    space = None
+    if exhaustive_threshold is not None:
+        space = get_input_space(
+            programs[0], min_io_len, max_io_len, exhaustive_threshold
+        )
+    if space is not None:
+        order = ShuffledRange(space.size, rng)
+        spread_pairs = [{} for _ in programs]
+    drawn = 0
+    exhausted = False
+    pool_class = StratifiedPool if stratified else IOPool
+    pools = [pool_class(num_examples) for _ in programs]
+    samples = [0] * len(programs)
+    elapsed = [0.0] * len(programs)
+    active = set(range(len(programs)))
+    infeasible = [None] * len(programs)
+    if precheck is not None:
+        for (index, program) in enumerate(programs):
+            with metrics[index].timer("precheck"):
+                infeasible[index] = check_feasibility(
+                    language, program, min_variance, min_io_len, max_io_len
+                )
+    if precheck == "reject":
+        active = set(i for i in active if infeasible[i] is None)
+    sample = sample_inputs_batched if batched else sample_inputs
+    batch_size = num_examples
+    hit_max_samples = False
+    pbar = tqdm(
+        total=len(programs),
+        desc="Shared IO For Programs",
+        unit="programs",
+        disable=not show_progress,
+    )
+    pbar.update(len(programs) - len(active))
+
+    while active:
+        if max_samples is not None:
+            batch_size = min(batch_size, max_samples - max(samples))
+        start = time.perf_counter()
+        if space is not None:
+            inputs = columns_to_inputs(space.decode(order[drawn : drawn + batch_size]))
+        elif stratified:
+            # mutate the inputs of one of the programs that are still sampling
+            pool = pools[sorted(active)[rng.integers(len(active))]]
+            inputs = sample_inputs_stratified(
+                programs[0], pool, batch_size, min_io_len, max_io_len, batched, rng
+            )
+        else:
+            inputs = sample(programs[0], batch_size, min_io_len, max_io_len, rng)
+        sampled = time.perf_counter()
+        all_outputs = trie.run_batch(inputs, active)
+        executed = time.perf_counter()
+        accepted = [0] * len(programs)
+        for index in active:
+            outputs = [o[index] for o in all_outputs]
+            for output_value in outputs:
+                # raised like the executors of generate_interesting raise
+                if isinstance(output_value, ExecutionError):
+                    print("ERROR: failed to execute program")
+                    print("ERROR: program = {}".format(programs[index].src))
+                    raise output_value.error
+            io_pairs = pair_outputs(programs[index], inputs, outputs, max_bound)
+            accepted[index] = add_to_pool(pools[index], io_pairs)
+            if space is not None:
+                keep_spread_pairs(spread_pairs[index], io_pairs, num_examples)
+        pooled = time.perf_counter()
+        # the shared phases are charged to the active programs in equal parts
+        for index in active:
+            metrics[index].add_time("sampling", (sampled - start) / len(active))
+            metrics[index].add_time("execution", (executed - sampled) / len(active))
+            metrics[index].add_time("pool", (pooled - executed) / len(active))
+            metrics[index].count("rounds")
+            metrics[index].count("samples", len(inputs))
+            metrics[index].count("accepted", accepted[index])
+        mean_accepted = sum(accepted) // len(active)
+        drawn += len(inputs)
+        now = time.time() - t
+        for index in list(active):
+            samples[index] += len(inputs)
+            elapsed[index] = now
+            with metrics[index].timer("interesting"):
+                interesting = pools[index].is_interesting(min_variance)
+            # infeasible programs are fast-tracked after a single round
+            if interesting or infeasible[index] is not None:
+                active.remove(index)
+                pbar.update(1)
+        if space is not None and drawn >= space.size:
+            exhausted = True
+            break
+        if timeout is not None and now > timeout:
+            break
+        if max_samples is not None and max(samples) >= max_samples:
+            hit_max_samples = True
+            break
+        if adaptive_batch:
+            batch_size = next_batch_size(batch_size, mean_accepted, num_examples)
+    pbar.close()
+
+    results = []
+    for (i, program) in enumerate(programs):
+        io_pairs = pools[i].pairs()
+        if exhausted and i in active:
+            io_pairs = [pair for pairs in spread_pairs[i].values() for pair in pairs]
+            io_pairs = select_spread(io_pairs, num_examples, min_variance)
+        d = format_examples(
+            program,
+            io_pairs,
+            elapsed[i],
+            timeout,
+            i in active and not (hit_max_samples or exhausted),
+            samples[i],
+            i in active and hit_max_samples,
+            metrics[i],
+        )
+        if space is not None:
+            d["input_space_size"] = space.size
+            d["exhausted_inputs"] = samples[i] >= space.size
+        if infeasible[i] is not None:
+            d["infeasible"] = infeasible[i]
+        results.append(d)
+    return results
 
 
-def format_examples(program, io_pairs, elapsed, timeout, hit_timeout, samples):
-    return {
+def format_examples(
+    program,
+    io_pairs,
+    elapsed,
+    timeout,
+    hit_timeout,
+    samples,
+    hit_max_samples=False,
+    metrics=None,
+):
+    d = {
         "program": program,
         "io_pairs": [{"i": i, "o": o} for (i, o) in io_pairs],
         "output_variance": get_output_variance(get_outputs(io_pairs)),
@@ -241,7 +1010,11 @@ def format_examples(program, io_pairs, elapsed, timeout, hit_timeout, samples):
         "timeout": timeout,
         "hit_timeout": hit_timeout,
         "samples": samples,
+        "hit_max_samples": hit_max_samples,
     }
+    if metrics is not None:
+        d["metrics"] = metrics.as_dict(elapsed)
+    return d
 
 
 def reduce_io_pairs(io_pairs, num_examples):
@@ -293,7 +1066,7 @@ def test_io(program, io_pair):
 def pretty_print_results(d, margin=7, debug=False):
     print("program: ", d["program"].src.replace("\n", " | "))
     inputs = [v for pair in d["io_pairs"] for k, v in pair.items() if k == "i"]
-    col_width = max(len(str(v)) for v in inputs) + margin
+    col_width = max([len(str(v)) for v in inputs], default=0) + margin
     for io_pair in d["io_pairs"]:
         i = str(io_pair["i"])
         o = str(io_pair["o"])
@@ -302,6 +1075,12 @@ def pretty_print_results(d, margin=7, debug=False):
         print(
             "WARN: Timeout hit while finding most interesting io_pairs for above program."
         )
+    if d.get("hit_max_samples"):
+        print(
+            "WARN: Sample budget used up while finding most interesting io_pairs for above program."
+        )
+    if d.get("infeasible"):
+        print("WARN: Minimum output variance unreachable:", d["infeasible"])
     if debug:
         print(
             (
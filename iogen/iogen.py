@@ -1,30 +1,41 @@
 import argparse
+import io
 import json
 import os
 import sys
+from contextlib import redirect_stdout
 
-from tqdm import trange
-
-from iogen.compiler import Program
+# NumPy, tqdm, multiprocessing and iogen.io (which needs NumPy and tqdm) are
+# imported where they are first used, so parsing arguments and -h stay fast
+# (see tests/test_startup.py).
+from iogen.compiler import compile_source
 from iogen.dsl import get_language_func
-from iogen.io import generate_interesting, pretty_print_results
+from iogen.fingerprint import DEFAULT_NUM_PROBES, probe_inputs, program_fingerprint
+from iogen.metrics import RunMetrics, write_metrics_json, write_metrics_prometheus
+from iogen.output import JsonlWriter, serialize_result
+from iogen.resume import (
+    completed_keys,
+    read_json_results,
+    read_jsonl_results,
+    task_key,
+)
+from iogen.shards import DEFAULT_SHARD_TASKS, ShardWriter, manifest_programs
 
 DEFAULT_MAXV = 99
+DEFAULT_TIMEOUT = 10
 DEFAULT_OUTPUT_JSON = "io.json"
+DEFAULT_OUTPUT_JSONL = "io.jsonl"
+DEFAULT_OUTPUT_BINARY = "io.bin"
 LANG_CHOICES = ("simplelist", "linq", "extended")
+PRECHECK_CHOICES = ("fast", "reject")
+BACKEND_CHOICES = ("interpreter", "codegen", "numpy")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8517
 
 
 def _serialize_programs(d):
     """ Serialize Program objects to strings, so data is JSON serializable. """
-    newd = []
-    for i in d:
-        newi = {}
-        for k, v in i.items():
-            if k == "program" and isinstance(v, Program):
-                v = v.src.replace("\n", " | ")
-            newi[k] = v
-        newd.append(newi)
-    return newd
+    return [serialize_result(i) for i in d]
 
 
 def write_json(d, to_json):
@@ -33,23 +44,51 @@ def write_json(d, to_json):
         json.dump(d, f)
 
 
-def generate_examples(*args, **kwargs):
+def get_generation_kwargs(cli_args, kwargs):
     """
-    Run IO generation with defaults set by CLI arguments.
+    Returns a copy of kwargs with generation defaults set by CLI arguments.
     """
-    cli_args = kwargs.pop("cli_args")
+    kwargs = dict(kwargs)
+    max_samples = kwargs.get("max_samples", cli_args.max_samples)
+    array_values = kwargs.get("array_values", cli_args.array_values)
+    # Array values are run by the batch executor of the "numpy" backend.
+    backend = "numpy" if array_values else kwargs.get("backend", cli_args.backend)
+    timeout = cli_args.timeout
+    if timeout is None and max_samples is None:
+        timeout = DEFAULT_TIMEOUT
     kwargs.update(
         {
             "num_examples": kwargs.get("num_examples", cli_args.num_examples),
-            "timeout": kwargs.get("timeout", cli_args.timeout),
+            "timeout": kwargs.get("timeout", timeout),
+            "max_samples": max_samples,
             "min_bound": kwargs.get("min_bound", cli_args.min_bound),
             "max_bound": kwargs.get("max_bound", cli_args.max_bound),
             "min_variance": kwargs.get("min_variance", cli_args.min_variance),
             "maxv": kwargs.get("maxv", cli_args.maxv),
             "max_io_len": kwargs.get("max_io_len", cli_args.max_io_len),
+            "batched": kwargs.get("batched", cli_args.batched),
+            "backend": backend,
+            "array_values": array_values,
+            "exhaustive_threshold": kwargs.get(
+                "exhaustive_threshold", cli_args.exhaustive_threshold
+            ),
+            "precheck": kwargs.get("precheck", cli_args.precheck),
+            "stratified": kwargs.get("stratified", cli_args.stratified),
+            "adaptive_batch": kwargs.get("adaptive_batch", cli_args.adaptive_batch),
         }
     )
+    return kwargs
+
+
+def generate_examples(*args, **kwargs):
+    """
+    Run IO generation with defaults set by CLI arguments.
+    """
+    cli_args = kwargs.pop("cli_args")
+    kwargs = get_generation_kwargs(cli_args, kwargs)
     language = kwargs.get("language", cli_args.language(kwargs))
+    from iogen.io import generate_interesting
+
     return generate_interesting(language, *args, **kwargs)
 
 
@@ -72,6 +111,8 @@ def get_stock_tasks():
 
 
 def progress(tasks):
+    from tqdm import trange
+
     # A low mininterval setting is used to avoid skipping updates
     return trange(
         len(tasks),
@@ -125,28 +166,316 @@ def read_stdin():
     return tasks
 
 
+def get_task_key(args, task):
+    kwargs = get_generation_kwargs(args, task.get("kwargs", {}))
+    kwargs["seed"] = args.seed
+    return task_key(task["source"], args.language_name, kwargs)
+
+
+def skip_completed_tasks(args, tasks, results):
+    """ Removes tasks which already have a result in results. """
+    keys = completed_keys(results)
+    remaining = [t for t in tasks if get_task_key(args, t) not in keys]
+    print("Resuming: skipping {} completed tasks".format(len(tasks) - len(remaining)))
+    return remaining
+
+
+def get_task_fingerprint(args, task, probes):
+    """
+    Returns a key for the behaviour of the task's program (its generation kwargs,
+    input types, input bounds and outputs on the probe inputs), or None if it
+    does not compile. probes caches the probe inputs for each of these domains.
+    """
+    kwargs = get_generation_kwargs(args, task.get("kwargs", {}))
+    kwargs.pop("backend")
+    kwargs.pop("array_values")
+    try:
+        with redirect_stdout(io.StringIO()):
+            program = compile_source(
+                args.language(kwargs),
+                task["source"],
+                kwargs["max_bound"],
+                kwargs["maxv"],
+                min_bound=kwargs["min_bound"],
+            )
+    except Exception:
+        return None
+    if program is None:
+        return None
+    from iogen.io import sampled_range
+
+    # Probes are drawn from the values the samplers draw for each input, so
+    # programs are only compared with programs sampled on the same inputs
+    bounds = [sampled_range(*b) for b in program.bounds]
+    if any(high <= low for (low, high) in bounds):
+        return None
+    ins = str(program.ins)
+    domain = json.dumps([kwargs, ins, bounds], sort_keys=True)
+    if domain not in probes:
+        probes[domain] = probe_inputs(
+            program.ins,
+            num_probes=args.num_probes,
+            max_len=kwargs["max_io_len"],
+            bounds=bounds,
+        )
+    behaviour = program_fingerprint(program, probes[domain])
+    return (domain, behaviour)
+
+
+def program_length(source):
+    return source.count("<-")
+
+
+def dedup_tasks(args, tasks):
+    """
+    Collapses tasks whose programs are observationally equivalent, i.e. compute
+    the same outputs on a shared, seeded set of probe inputs. Only the shortest
+    program of each class is kept, with the sources of the programs merged into
+    it under "equivalent". Programs that do not compile are kept as they are.
+    """
+    probes = {}
+    classes = {}
+    for (index, task) in enumerate(tasks):
+        key = get_task_fingerprint(args, task, probes)
+        classes.setdefault(index if key is None else key, []).append(index)
+
+    kept = []
+    for indices in classes.values():
+        rep = min(indices, key=lambda i: (program_length(tasks[i]["source"]), i))
+        merged = [tasks[i]["source"] for i in indices if i != rep]
+        task = tasks[rep]
+        if merged:
+            task = dict(task, equivalent=task.get("equivalent", []) + merged)
+            for source in merged:
+                print("Dedup: merged ({}) into ({})".format(source, task["source"]))
+        kept.append((rep, task))
+    kept.sort(key=lambda t: t[0])
+    print(
+        "Dedup: {} programs merged into {} representatives".format(
+            len(tasks) - len(kept), len(kept)
+        )
+    )
+    return [task for (_, task) in kept]
+
+
+def key_entropy(key):
+    return int(key[:16], 16)
+
+
+def get_task_rng(args, task):
+    """
+    Returns the numpy.random.Generator for a task. With --seed, its seed is a
+    child of the seed derived from the task key, so each task samples the same
+    inputs whether it runs serially, in a worker process, or after --resume.
+    Without --seed, the Generator is unseeded.
+    """
+    import numpy as np
+
+    if args.seed is None:
+        return np.random.default_rng()
+    spawn_key = (key_entropy(get_task_key(args, task)),)
+    return np.random.default_rng(np.random.SeedSequence(args.seed, spawn_key=spawn_key))
+
+
+def finish_result(args, task, d):
+    """ Adds the task's key (and the programs merged into it) to a result. """
+    d["task_key"] = get_task_key(args, task)
+    if "equivalent" in task:
+        d["equivalent"] = task["equivalent"]
+    return d
+
+
 def get_result(args, index, tasks):
     t = tasks[index]
     source = t["source"]
     kwargs = t.get("kwargs", {})
-    return generate_examples(source, cli_args=args, **kwargs)
+    d = generate_examples(source, cli_args=args, rng=get_task_rng(args, t), **kwargs)
+    return finish_result(args, t, d)
+
+
+def get_results(args, tasks):
+    if args.share_prefixes:
+        return get_shared_results(args, tasks)
+    return list(iter_results(args, tasks))
+
+
+def iter_results(args, tasks):
+    """
+    Yields task results in task order as they finish. With --share-prefixes,
+    results are yielded in the order their groups finish.
+    """
+    if args.share_prefixes:
+        return (d for (_, d) in iter_shared_results(args, tasks))
+    if args.jobs > 1:
+        return iter_parallel_results(args, tasks)
+    return (get_result(args, i, tasks) for i in progress(tasks))
+
+
+def get_shared_results(args, tasks):
+    """ Returns the results of iter_shared_results, in task order. """
+    results = [None] * len(tasks)
+    for (index, d) in iter_shared_results(args, tasks):
+        results[index] = d
+    return results
+
+
+def iter_shared_results(args, tasks):
+    """
+    Generates results for tasks with iter_interesting_shared, with tasks that
+    have the same generation parameters run as one corpus. Yields (task index,
+    result) pairs as each group of programs finishes, so streamed output keeps
+    the results of finished groups if the run is interrupted.
+    """
+    import numpy as np
+
+    from iogen.io import iter_interesting_shared
+
+    groups = {}
+    for (index, task) in enumerate(tasks):
+        kwargs = get_generation_kwargs(args, task.get("kwargs", {}))
+        backend = kwargs.pop("backend")
+        if kwargs.pop("array_values") or backend != "interpreter":
+            raise ValueError(
+                "Task ({}) sets array_values or backend, which --share-prefixes"
+                " does not support".format(task["source"])
+            )
+        key = json.dumps(kwargs, sort_keys=True)
+        groups.setdefault(key, (kwargs, []))[1].append(index)
+
+    for (kwargs, indices) in groups.values():
+        language = args.language(kwargs)
+        sources = [tasks[i]["source"] for i in indices]
+        rng = np.random.default_rng()
+        if args.seed is not None:
+            # The programs of a group share their inputs, so the group is seeded
+            # from all of its tasks, and its samples change with its members
+            # (e.g. when --resume skips some of them).
+            spawn_key = tuple(
+                key_entropy(get_task_key(args, tasks[i])) for i in indices
+            )
+            rng = np.random.default_rng(
+                np.random.SeedSequence(args.seed, spawn_key=spawn_key)
+            )
+        for (i, d) in iter_interesting_shared(language, sources, rng=rng, **kwargs):
+            yield (indices[i], finish_result(args, tasks[indices[i]], d))
+
+
+_worker_args = None
+
+
+def _init_worker(args):
+    global _worker_args
+    args.language = get_language_func(args.language_name)
+    _worker_args = args
+
+
+def _get_worker_result(task):
+    kwargs = dict(task.get("kwargs", {}), show_progress=False)
+    kwargs["rng"] = get_task_rng(_worker_args, task)
+    d = generate_examples(task["source"], cli_args=_worker_args, **kwargs)
+    d = finish_result(_worker_args, task, d)
+    # Executors hold DSL closures, which cannot be sent back to the parent process.
+    d["program"] = d["program"]._replace(fun=None)
+    return d
+
+
+def iter_parallel_results(args, tasks):
+    """
+    Generates results for tasks across a pool of args.jobs worker processes.
+    Results are yielded in task order; programs in the results have no executor.
+    """
+    import multiprocessing
+
+    from tqdm import tqdm
 
+    worker_args = argparse.Namespace(**vars(args))
+    worker_args.language = None
+    with multiprocessing.Pool(
+        args.jobs, initializer=_init_worker, initargs=(worker_args,)
+    ) as pool:
+        results = pool.imap(_get_worker_result, tasks)
+        yield from tqdm(
+            results,
+            total=len(tasks),
+            miniters=1,
+            mininterval=0.000001,
+            unit="tasks",
+            desc="Total Progress",
+        )
+
+
+def stream_output(args, tasks, run_metrics):
+    """
+    Writes each result to args.to_jsonl, or to the shards in args.out_dir, as
+    soon as its task finishes.
+    """
+    if args.out_dir:
+        writer = ShardWriter(
+            args.out_dir,
+            max_tasks=args.shard_tasks,
+            max_bytes=args.shard_bytes,
+            append=args.resume,
+        )
+        path = args.out_dir
+    else:
+        writer = JsonlWriter(args.to_jsonl, mode="a" if args.resume else "w")
+        path = args.to_jsonl
+    with writer:
+        for d in iter_results(args, tasks):
+            run_metrics.add(d)
+            writer.write(d)
+    print()  # required to move to next line due to progress bar
+    print(path)
+
+
+def print_output(args, results, previous_results=()):
+    from iogen.io import pretty_print_results
 
-def print_output(args, results):
     print()  # required to move to next line due to progress bar
     if args.json:
-        write_json(results, args.to_json)
-    else:
+        write_json(list(previous_results) + results, args.to_json)
+    if args.binary:
+        from iogen.columnar import write_columnar
+
+        write_columnar(list(previous_results) + results, args.to_binary)
+    if not (args.json or args.binary):
         for d in results:
             pretty_print_results(d)
     if args.json:
         print(args.to_json)
+    if args.binary:
+        print(args.to_binary)
+
+
+def write_run_metrics(args, run_metrics):
+    if args.metrics_json:
+        write_metrics_json(run_metrics, args.metrics_json)
+        print(args.metrics_json)
+    if args.metrics_prom:
+        write_metrics_prometheus(run_metrics, args.metrics_prom)
+        print(args.metrics_prom)
 
 
 def parse_args(args):
     parser = argparse.ArgumentParser()
     parser.add_argument("-n", "--num-examples", type=int, default=10)
-    parser.add_argument("-t", "--timeout", type=int, default=10)
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        help="seconds of sampling per program (default: 10, no limit with --max-samples)",
+        type=int,
+    )
+    parser.add_argument(
+        "--max-samples",
+        help="number of samples per program, a reproducible alternative to --timeout",
+        type=int,
+    )
+    parser.add_argument(
+        "--adaptive-batch",
+        help="grow the number of samples per round while few samples are kept",
+        action="store_true",
+        default=False,
+    )
     parser.add_argument("--min-bound", type=int, default=0)
     parser.add_argument("--max-bound", type=int, default=99)
     parser.add_argument("--min-variance", type=float, default=3.5)
@@ -154,23 +483,196 @@ def parse_args(args):
         "--maxv", help="max val for item in list", type=int, default=DEFAULT_MAXV
     )
     parser.add_argument("--max-io-len", type=int, default=10)
+    parser.add_argument(
+        "--batched",
+        help="sample the inputs for each round in a single batch",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--array-values",
+        help="keep sampled list inputs in NumPy arrays through execution (implies"
+        " --backend numpy)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--exhaustive-threshold",
+        help="enumerate every input, in random order, instead of sampling when a"
+        " program has at most this many",
+        type=int,
+    )
+    parser.add_argument(
+        "--precheck",
+        help="statically check whether a program's outputs can reach --min-variance,"
+        " and sample a single round (fast) or nothing (reject) if they cannot",
+        choices=PRECHECK_CHOICES,
+    )
+    parser.add_argument(
+        "--stratified",
+        help="balance output buckets and mutate inputs of rare outputs while sampling",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--seed",
+        help="seed for sampling; each task's seed is derived from it and the task",
+        type=int,
+    )
     parser.add_argument("--json", action="store_true", default=False)
     parser.add_argument("--to-json", default=DEFAULT_OUTPUT_JSON)
+    parser.add_argument(
+        "--jsonl",
+        help="stream results to a JSON lines file as each task finishes",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument("--to-jsonl", default=DEFAULT_OUTPUT_JSONL)
+    parser.add_argument(
+        "--binary",
+        help="write results in the columnar binary format (see iogen.columnar)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument("--to-binary", default=DEFAULT_OUTPUT_BINARY)
+    parser.add_argument(
+        "--out-dir",
+        help="stream results to JSON lines shards in a directory, with a manifest",
+    )
+    parser.add_argument(
+        "--shard-tasks",
+        help="max number of tasks per shard with --out-dir (default: %(default)s)",
+        type=int,
+        default=DEFAULT_SHARD_TASKS,
+    )
+    parser.add_argument(
+        "--shard-bytes",
+        help="start a new shard with --out-dir once a shard has this many bytes",
+        type=int,
+    )
+    parser.add_argument(
+        "--resume",
+        help="keep results already in the output file and only generate missing tasks",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--metrics-json", help="write a run-level summary of metrics to a JSON file"
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        help="write run-level metrics to a file in the Prometheus text format",
+    )
     parser.add_argument("--language", choices=LANG_CHOICES, default="extended")
+    parser.add_argument(
+        "--backend",
+        help="program executor used while sampling",
+        choices=BACKEND_CHOICES,
+        default="interpreter",
+    )
+    parser.add_argument(
+        "--share-prefixes",
+        help="run programs with common instruction prefixes together (ignores --jobs;"
+        " not with --array-values or --backend)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--dedup",
+        help="skip programs with the same outputs on probe inputs as another program",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--num-probes",
+        help="number of probe inputs used by --dedup",
+        type=int,
+        default=DEFAULT_NUM_PROBES,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of worker processes used to generate tasks",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--serve",
+        help="run a local HTTP server that generates IO examples for POSTed tasks",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--host", help="address --serve listens on", default=DEFAULT_HOST
+    )
+    parser.add_argument(
+        "--port", help="port --serve listens on", type=int, default=DEFAULT_PORT
+    )
     group = parser.add_mutually_exclusive_group()
     group.add_argument("--stdin", action="store_true")
     group.add_argument("--from-json", nargs="*")
     group.add_argument("--from-txt", nargs="*")
     args = parser.parse_args(args)
+    if args.resume and not (args.json or args.jsonl or args.out_dir):
+        parser.error("--resume requires --json, --jsonl or --out-dir")
+    if args.binary and (args.jsonl or args.out_dir):
+        parser.error(
+            "--binary cannot be combined with --jsonl or --out-dir (convert the"
+            " output with python -m iogen.columnar)"
+        )
+    if args.share_prefixes and (args.array_values or args.backend != "interpreter"):
+        parser.error(
+            "--share-prefixes runs programs with its own executor, and cannot be"
+            " combined with --array-values or --backend"
+        )
     args.to_json = os.path.abspath(args.to_json)
+    args.to_jsonl = os.path.abspath(args.to_jsonl)
+    args.to_binary = os.path.abspath(args.to_binary)
+    if args.out_dir:
+        args.out_dir = os.path.abspath(args.out_dir)
+    if args.metrics_json:
+        args.metrics_json = os.path.abspath(args.metrics_json)
+    if args.metrics_prom:
+        args.metrics_prom = os.path.abspath(args.metrics_prom)
+    args.language_name = args.language
     args.language = get_language_func(args.language)
     return args
 
 
 def main(args):
+    """
+    Generates IO examples for all tasks. Returns the list of new results, except in
+    --jsonl and --out-dir modes, where results are streamed to files and not kept
+    in memory.
+    With --serve, runs the generation server (see iogen.server) instead.
+    """
+    if args.serve:
+        from iogen.server import serve
+
+        serve(args)
+        return None
     tasks = get_tasks(args)
-    results = [get_result(args, i, tasks) for i in progress(tasks)]
-    print_output(args, results)
+    if args.dedup:
+        tasks = dedup_tasks(args, tasks)
+    previous_results = []
+    if args.resume:
+        if args.out_dir:
+            previous_results = manifest_programs(args.out_dir)
+        elif args.jsonl:
+            previous_results = read_jsonl_results(args.to_jsonl)
+        else:
+            previous_results = read_json_results(args.to_json)
+        tasks = skip_completed_tasks(args, tasks, previous_results)
+    run_metrics = RunMetrics()
+    if args.jsonl or args.out_dir:
+        stream_output(args, tasks, run_metrics)
+        write_run_metrics(args, run_metrics)
+        return None
+    results = get_results(args, tasks)
+    for d in results:
+        run_metrics.add(d)
+    print_output(args, results, previous_results)
+    write_run_metrics(args, run_metrics)
     return results
 
 
@@ -0,0 +1,174 @@
+import heapq
+import json
+import time
+
+PHASES = ("compile", "precheck", "sampling", "execution", "pool", "interesting")
+COUNTERS = ("samples", "accepted", "rounds")
+COUNTER_HELP = {
+    "samples": "Inputs sampled.",
+    "accepted": "Sampled IO pairs kept in the IO pool.",
+    "rounds": "Sampling rounds.",
+}
+
+
+class PhaseTimer(object):
+    def __init__(self, metrics, phase):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.seconds[self.phase] += time.perf_counter() - self.start
+
+
+class Metrics(object):
+    """
+    Per-task timings of the phases of IO generation (see PHASES), plus counters
+    of samples, samples accepted into the IO pool, and sampling rounds.
+
+        metrics = Metrics()
+        with metrics.timer("sampling"):
+            ...
+        metrics.count("rounds")
+    """
+
+    def __init__(self):
+        self.seconds = {phase: 0.0 for phase in PHASES}
+        self.counters = {counter: 0 for counter in COUNTERS}
+        self._timers = {phase: PhaseTimer(self, phase) for phase in PHASES}
+
+    def timer(self, phase):
+        return self._timers[phase]
+
+    def add_time(self, phase, seconds):
+        self.seconds[phase] += seconds
+
+    def count(self, counter, n=1):
+        self.counters[counter] += n
+
+    def as_dict(self, runtime_seconds=None):
+        """
+        The metrics as a JSON serializable dict. Rates are computed over
+        runtime_seconds if it is given, else over the time of all phases.
+        """
+        d = {"{}_seconds".format(phase): s for (phase, s) in self.seconds.items()}
+        d.update(self.counters)
+        if runtime_seconds is None:
+            runtime_seconds = sum(self.seconds.values())
+        samples = self.counters["samples"]
+        d["samples_per_second"] = samples / runtime_seconds if runtime_seconds else None
+        d["acceptance_ratio"] = self.counters["accepted"] / samples if samples else None
+        return d
+
+
+class RunMetrics(object):
+    """
+    Run-level summary of the metrics of every task result added to it. Results
+    can be added one at a time, so streamed results do not need to be kept.
+    """
+
+    def __init__(self, top=10):
+        self.top = top
+        self.tasks = 0
+        self.timeouts = 0
+        self.budget_exhausted = 0
+        self.runtime_seconds = 0.0
+        self.seconds = {phase: 0.0 for phase in PHASES}
+        self.counters = {counter: 0 for counter in COUNTERS}
+        self.slowest = []  # heap of (runtime_seconds, source) of the top slowest
+
+    def add(self, d):
+        self.tasks += 1
+        self.timeouts += int(bool(d.get("hit_timeout")))
+        self.budget_exhausted += int(bool(d.get("hit_max_samples")))
+        self.runtime_seconds += d["runtime_seconds"]
+        metrics = d.get("metrics", {})
+        for phase in PHASES:
+            self.seconds[phase] += metrics.get("{}_seconds".format(phase), 0.0)
+        for counter in COUNTERS:
+            self.counters[counter] += metrics.get(counter, 0)
+        program = d["program"]
+        source = program if isinstance(program, str) else program.src
+        item = (d["runtime_seconds"], source.replace("\n", " | "))
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+    def as_dict(self):
+        d = {
+            "tasks": self.tasks,
+            "timeouts": self.timeouts,
+            "budget_exhausted": self.budget_exhausted,
+            "runtime_seconds": self.runtime_seconds,
+        }
+        d.update({"{}_seconds".format(p): s for (p, s) in self.seconds.items()})
+        d.update(self.counters)
+        samples = self.counters["samples"]
+        d["samples_per_second"] = (
+            samples / self.runtime_seconds if self.runtime_seconds else None
+        )
+        d["acceptance_ratio"] = self.counters["accepted"] / samples if samples else None
+        d["slowest_programs"] = [
+            {"program": source, "runtime_seconds": seconds}
+            for (seconds, source) in sorted(self.slowest, reverse=True)
+        ]
+        return d
+
+
+def write_metrics_json(run_metrics, path):
+    with open(path, "w") as f:
+        json.dump(run_metrics.as_dict(), f, indent=2)
+
+
+def format_prometheus(run_metrics):
+    """Formats the run-level metrics in the Prometheus text exposition format."""
+    lines = []
+
+    def metric(name, metric_type, description, samples):
+        lines.append("# HELP iogen_{} {}".format(name, description))
+        lines.append("# TYPE iogen_{} {}".format(name, metric_type))
+        for (labels, value) in samples:
+            lines.append("iogen_{}{} {}".format(name, labels, value))
+
+    metric("tasks_total", "counter", "Tasks generated.", [("", run_metrics.tasks)])
+    metric(
+        "task_timeouts_total",
+        "counter",
+        "Tasks that hit the timeout.",
+        [("", run_metrics.timeouts)],
+    )
+    metric(
+        "task_budget_exhausted_total",
+        "counter",
+        "Tasks that hit the sample budget.",
+        [("", run_metrics.budget_exhausted)],
+    )
+    metric(
+        "runtime_seconds_total",
+        "counter",
+        "Time spent generating tasks.",
+        [("", run_metrics.runtime_seconds)],
+    )
+    metric(
+        "phase_seconds_total",
+        "counter",
+        "Time spent in each phase of IO generation.",
+        [('{{phase="{}"}}'.format(p), s) for (p, s) in run_metrics.seconds.items()],
+    )
+    for counter in COUNTERS:
+        metric(
+            "{}_total".format(counter),
+            "counter",
+            COUNTER_HELP[counter],
+            [("", run_metrics.counters[counter])],
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_prometheus(run_metrics, path):
+    with open(path, "w") as f:
+        f.write(format_prometheus(run_metrics))
@@ -0,0 +1,37 @@
+import json
+
+from iogen.compiler import Program
+
+
+def serialize_result(d):
+    """ Serialize the Program in a result to a string, so it is JSON serializable. """
+    newd = {}
+    for k, v in d.items():
+        if k == "program" and isinstance(v, Program):
+            v = v.src.replace("\n", " | ")
+        newd[k] = v
+    return newd
+
+
+class JsonlWriter(object):
+    """
+    Writes each result as one line of JSON as soon as it is available, so memory
+    use does not grow with the number of tasks and finished tasks survive a crash.
+    """
+
+    def __init__(self, path, mode="w"):
+        self.path = path
+        self.f = open(path, mode)
+
+    def write(self, d):
+        self.f.write(json.dumps(serialize_result(d)) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,272 @@
+from bisect import bisect_left, insort
+
+
+def output_key(o):
+    """
+    Hashable canonical key for an output value, used to detect duplicate outputs.
+    """
+    if isinstance(o, list):
+        return tuple(o)
+    return o
+
+
+def output_stat(o):
+    """
+    The value an output contributes to the output variance (see
+    get_output_variance): ints and bools count as themselves, lists by their sum.
+    """
+    if isinstance(o, list):
+        return sum(o)
+    return int(o)
+
+
+class RunningVariance(object):
+    """
+    Welford-style running mean and variance that supports removing values.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        if self.n <= 1:
+            self.reset()
+            return
+        self.n -= 1
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self.m2 -= delta * (x - self.mean)
+
+    def variance(self):
+        if self.n == 0:
+            return None
+        return max(self.m2, 0.0) / self.n
+
+
+class IOPool(object):
+    """
+    A bounded pool of IO pairs that prefers pairs with distinct outputs.
+
+    Pairs are added a round at a time with extend, and kept in insertion order.
+    A round that takes the pool past its capacity evicts pairs in the order of
+    reduce_io_pairs: duplicates of frequent outputs first (newest first, see
+    find_duplicates), then the other duplicates (oldest first), then the newest
+    pairs if every output is distinct. Each output key has a live count, so a
+    round costs O(1) per pair while the pool has room, and O(capacity + round
+    size) when it overflows, where reduce_io_pairs is quadratic.
+
+    The pool also keeps the running variance of its outputs, so checking whether
+    it is interesting does not need to revisit every pair.
+    """
+
+    def __init__(self, capacity, key=output_key):
+        self.capacity = capacity
+        self.key = key
+        self._pairs = {}  # pair id -> (pair, key)
+        self._ids_by_key = {}  # key -> {pair id: None}, in insertion order
+        self._keys_by_count = {}  # count -> {key: None}
+        self._max_count = 0
+        self._next_id = 0
+        self._moments = RunningVariance()
+        self._non_empty_lists = 0
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def pairs(self):
+        return [pair for (pair, _) in self._pairs.values()]
+
+    def count(self, key):
+        return len(self._ids_by_key.get(key, ()))
+
+    def add(self, pair):
+        """
+        Adds a round of a single pair. Returns the evicted pair (which may be the
+        added pair), or None.
+        """
+        evicted = self.extend([pair])
+        return evicted[0] if evicted else None
+
+    def extend(self, pairs):
+        """
+        Adds a round of pairs, then evicts pairs while the pool is over capacity.
+        Returns the evicted pairs.
+        """
+        for pair in pairs:
+            self._insert(pair)
+        excess = len(self._pairs) - self.capacity
+        if excess <= 0:
+            return []
+        frequent, others = self._duplicates()
+        frequent.reverse()
+        evicted = [self._remove(i) for i in (frequent + others)[:excess]]
+        while len(self._pairs) > self.capacity:
+            evicted.append(self._remove(next(reversed(self._pairs))))
+        return evicted
+
+    def _duplicates(self):
+        """
+        The ids of pairs whose output an older pair already has, split like
+        find_duplicates into those whose output is more frequent than average
+        among the pairs before them, and the others.
+        """
+        seen = {}
+        frequent = []
+        others = []
+        for (t, (pair_id, (_, k))) in enumerate(self._pairs.items()):
+            c = seen.get(k, 0)
+            if c:
+                if c > t / float(len(seen)):
+                    frequent.append(pair_id)
+                else:
+                    others.append(pair_id)
+            seen[k] = c + 1
+        return frequent, others
+
+    def evict(self):
+        """Evicts the newest pair of the most duplicated output (or the newest pair)."""
+        if not self._pairs:
+            return None
+        if self._max_count > 1:
+            k = next(iter(self._keys_by_count[self._max_count]))
+            pair_id = next(reversed(self._ids_by_key[k]))
+        else:
+            pair_id = next(reversed(self._pairs))
+        return self._remove(pair_id)
+
+    def _insert(self, pair):
+        k = self.key(pair[1])
+        pair_id = self._next_id
+        self._next_id += 1
+        self._pairs[pair_id] = (pair, k)
+        self._add_stat(pair[1])
+        ids = self._ids_by_key.setdefault(k, {})
+        self._move_key(k, len(ids), len(ids) + 1)
+        ids[pair_id] = None
+        return pair_id, k
+
+    def _remove(self, pair_id):
+        pair, k = self._pairs.pop(pair_id)
+        self._remove_stat(pair[1])
+        ids = self._ids_by_key[k]
+        del ids[pair_id]
+        self._move_key(k, len(ids) + 1, len(ids))
+        if not ids:
+            del self._ids_by_key[k]
+        return pair
+
+    def variance(self):
+        """
+        Output variance of the pairs in the pool, with the same conventions as
+        get_output_variance (None for an empty pool or all empty list outputs).
+        """
+        if not self._pairs:
+            return None
+        first_output = next(iter(self._pairs.values()))[0][1]
+        if isinstance(first_output, list) and self._non_empty_lists == 0:
+            return None
+        return self._moments.variance()
+
+    def is_interesting(self, min_variance):
+        output_var = self.variance()
+        if output_var is None:
+            return False
+        return output_var >= min_variance
+
+    def _add_stat(self, o):
+        self._moments.add(output_stat(o))
+        if isinstance(o, list) and o:
+            self._non_empty_lists += 1
+
+    def _remove_stat(self, o):
+        self._moments.remove(output_stat(o))
+        if isinstance(o, list) and o:
+            self._non_empty_lists -= 1
+
+    def _move_key(self, k, old_count, new_count):
+        if old_count > 0:
+            keys = self._keys_by_count[old_count]
+            del keys[k]
+            if not keys:
+                del self._keys_by_count[old_count]
+                if self._max_count == old_count:
+                    self._max_count = new_count
+        if new_count > 0:
+            self._keys_by_count.setdefault(new_count, {})[k] = None
+            self._max_count = max(self._max_count, new_count)
+
+
+class StratifiedPool(IOPool):
+    """
+    An IOPool that stratifies pairs into buckets by output_stat, the value their
+    output contributes to the output variance, with a quota per bucket of
+    ceil(capacity / number of buckets seen so far).
+
+    Once the pool is full, a pair whose bucket is already at its quota is
+    rejected without entering the pool, and a pair that fills an empty or
+    underrepresented bucket replaces a pair from the most overrepresented
+    bucket. When every bucket holds a single pair, the pair closest to the mean
+    is replaced, so the pool keeps spreading out toward min_variance instead of
+    keeping the first distinct outputs it saw. The buckets are kept sorted by
+    output_stat, so that pair is found by bisection rather than a scan.
+    """
+
+    def __init__(self, capacity):
+        super(StratifiedPool, self).__init__(capacity, key=output_stat)
+        self._seen_keys = set()
+        self._sorted_keys = []
+
+    def bucket_pairs(self):
+        """The oldest pair of each bucket in the pool."""
+        return [self._pairs[next(iter(ids))][0] for ids in self._ids_by_key.values()]
+
+    def quota(self):
+        return max(1, -(-self.capacity // max(len(self._seen_keys), 1)))
+
+    def extend(self, pairs):
+        evicted = [self.add(pair) for pair in pairs]
+        return [pair for pair in evicted if pair is not None]
+
+    def add(self, pair):
+        k = self.key(pair[1])
+        self._seen_keys.add(k)
+        count = self.count(k)
+        if count > 0 and len(self._pairs) >= self.capacity and count >= self.quota():
+            return pair
+        pair_id, k = self._insert(pair)
+        if len(self._pairs) <= self.capacity:
+            return None
+        if self._max_count > 1:
+            if self.count(k) == self._max_count:
+                return self._remove(pair_id)
+            return self.evict()
+        # every bucket holds a single pair: drop the one closest to the mean (the
+        # closest below or above it), or the older one of two equally close
+        mean = self._moments.mean
+        keys = self._sorted_keys
+        j = bisect_left(keys, mean)
+        below = [keys[i] for i in (j - 1, j - 2) if i >= 0 and keys[i] != k]
+        above = [keys[i] for i in (j, j + 1) if i < len(keys) and keys[i] != k]
+        evicted = min(
+            (next(iter(self._ids_by_key[c])) for c in below[:1] + above[:1]),
+            key=lambda i: (abs(self._pairs[i][1] - mean), i),
+        )
+        return self._remove(evicted)
+
+    def _move_key(self, k, old_count, new_count):
+        super(StratifiedPool, self)._move_key(k, old_count, new_count)
+        if old_count == 0:
+            insort(self._sorted_keys, k)
+        elif new_count == 0:
+            del self._sorted_keys[bisect_left(self._sorted_keys, k)]
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+
+# Generation parameters that change the result of a task, besides its source.
+KEY_PARAMS = (
+    "min_bound",
+    "max_bound",
+    "maxv",
+    "num_examples",
+    "min_variance",
+    "min_io_len",
+    "max_io_len",
+)
+# Parameters that change the result of a task when they are set. They are left
+# out of the key when unset, so keys of results from runs without them still match.
+OPTIONAL_KEY_PARAMS = (
+    "max_samples",
+    "stratified",
+    "seed",
+    "precheck",
+    "exhaustive_threshold",
+)
+
+
+def canonical_source(source):
+    """Normalizes a program to the single-line "a <- [int] | b <- head a" form."""
+    lines = source.replace("|", "\n").split("\n")
+    return " | ".join(" ".join(l.split()) for l in lines if l.strip())
+
+
+def task_key(source, language_name, kwargs):
+    """
+    Hash of a task's canonical source and the generation parameters that affect
+    its result, used to recognize tasks that already have a stored result.
+    """
+    d = {k: kwargs.get(k) for k in KEY_PARAMS}
+    for k in OPTIONAL_KEY_PARAMS:
+        if kwargs.get(k) is not None and kwargs.get(k) is not False:
+            d[k] = kwargs[k]
+    d["source"] = canonical_source(source)
+    d["language"] = language_name
+    return hashlib.sha256(json.dumps(d, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def read_jsonl_results(path):
+    """
+    Reads results from a JSON lines file written by a previous (possibly
+    interrupted) run. A trailing partial line is truncated from the file, so
+    the file can be appended to.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    return [json.loads(line) for line in data[:end].decode("utf-8").splitlines()]
+
+
+def read_json_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def completed_keys(results):
+    return set(d["task_key"] for d in results if "task_key" in d)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import multiprocessing
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from iogen.compiler import compile_source
+from iogen.dsl import get_language, get_language_func
+from iogen.iogen import (
+    LANG_CHOICES,
+    finish_result,
+    generate_examples,
+    get_generation_kwargs,
+    get_task_rng,
+)
+from iogen.output import serialize_result
+
+
+class RequestError(Exception):
+    """A request that cannot be served, reported to the client with HTTP 400."""
+
+
+_worker_args = {}  # language name -> CLI args of the worker for that language
+
+
+def _init_worker(args):
+    """Builds every DSL once, so no request pays for building one."""
+    for name in LANG_CHOICES:
+        worker_args = argparse.Namespace(**vars(args))
+        worker_args.language_name = name
+        worker_args.language = get_language_func(name)
+        _worker_args[name] = worker_args
+        get_language(name, args.max_bound, args.min_bound)
+
+
+@lru_cache(maxsize=4096)
+def get_compiled_program(language_name, source, max_bound, maxv, min_bound, backend):
+    return compile_source(
+        get_language(language_name, max_bound, min_bound),
+        source,
+        max_bound,
+        maxv,
+        min_bound=min_bound,
+        backend=backend,
+    )
+
+
+def _serve_task(job):
+    """
+    Generates IO examples for one task in a worker process. Returns the result
+    serialized to JSON types, or a dict with the error if generation failed.
+    """
+    language_name, task = job
+    args = _worker_args[language_name]
+    try:
+        kwargs = dict(task.get("kwargs", {}), show_progress=False)
+        generation_kwargs = get_generation_kwargs(args, kwargs)
+        start = time.perf_counter()
+        program = get_compiled_program(
+            language_name,
+            task["source"],
+            generation_kwargs["max_bound"],
+            generation_kwargs["maxv"],
+            generation_kwargs["min_bound"],
+            generation_kwargs["backend"],
+        )
+        if program is None:
+            raise ValueError("Program has no valid inputs")
+        compile_seconds = time.perf_counter() - start
+        kwargs["rng"] = get_task_rng(args, task)
+        d = generate_examples(task["source"], cli_args=args, program=program, **kwargs)
+        d["metrics"]["compile_seconds"] = compile_seconds
+        return serialize_result(finish_result(args, task, d))
+    except Exception as e:
+        return {
+            "program": task["source"],
+            "error": "{}: {}".format(type(e).__name__, e),
+        }
+
+
+def parse_request(body, default_language):
+    """
+    Parses a request body of the form
+        {"language": "extended", "tasks": [{"source": ..., "kwargs": {...}}, ...]}
+    where language is optional and tasks can be given as "sources", a list of
+    program sources. Returns (language name, tasks).
+    """
+    try:
+        request = json.loads(body.decode("utf-8"))
+    except ValueError as e:
+        raise RequestError("Invalid JSON ({})".format(e))
+    if not isinstance(request, dict):
+        raise RequestError("Expected a JSON object")
+    language_name = request.get("language", default_language)
+    if language_name not in LANG_CHOICES:
+        raise RequestError("Language ({}) not recognized".format(language_name))
+    tasks = request.get("tasks")
+    if tasks is None:
+        tasks = [{"source": source} for source in request.get("sources", [])]
+    if not isinstance(tasks, list) or not all(
+        isinstance(t, dict)
+        and isinstance(t.get("source"), str)
+        and isinstance(t.get("kwargs", {}), dict)
+        for t in tasks
+    ):
+        raise RequestError('Expected "tasks" to be a list of {"source": ...} objects')
+    return language_name, tasks
+
+
+class GenerationServer(ThreadingHTTPServer):
+    """
+    An HTTP server that generates IO examples. Requests are handled in threads,
+    and their tasks run on a shared pool of worker processes, which keep NumPy
+    imported, every DSL built, and compiled programs cached between requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, args):
+        super(GenerationServer, self).__init__((args.host, args.port), RequestHandler)
+        self.args = args
+        worker_args = argparse.Namespace(**vars(args))
+        worker_args.language = None
+        self.workers = max(args.jobs, 1)
+        self.pool = multiprocessing.Pool(
+            self.workers, initializer=_init_worker, initargs=(worker_args,)
+        )
+
+    def generate(self, language_name, tasks):
+        return self.pool.map(_serve_task, [(language_name, t) for t in tasks])
+
+    def server_close(self):
+        super(GenerationServer, self).server_close()
+        self.pool.terminate()
+        self.pool.join()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error": "Not found"})
+            return
+        self.send_json(200, {"status": "ok", "workers": self.server.workers})
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self.send_json(404, {"error": "Not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            language_name, tasks = parse_request(
+                self.rfile.read(length), self.server.args.language_name
+            )
+        except RequestError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        results = self.server.generate(language_name, tasks)
+        self.send_json(200, {"results": results})
+
+    def send_json(self, status, d):
+        body = json.dumps(d).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(args):
+    server = GenerationServer(args)
+    host, port = server.server_address[:2]
+    print("Serving on http://{}:{} with {} workers".format(host, port, server.workers))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
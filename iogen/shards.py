@@ -0,0 +1,124 @@
+"""
+Sharded output: results are written as JSON lines to numbered shards in an
+output directory, and a new shard is started once the current one reaches a
+number of tasks or bytes. manifest.json lists the finished shards, with the
+SHA-256 of each shard file and the source, task key and number of examples of
+each program in it, so shards can be read independently and a corrupt shard
+only loses its own programs.
+"""
+
+import hashlib
+import json
+import os
+
+from iogen.output import serialize_result
+
+MANIFEST = "manifest.json"
+SHARD_NAME = "shard-{:05d}.jsonl"
+DEFAULT_SHARD_TASKS = 10000
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {"shards": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(out_dir, manifest):
+    """Replaces the manifest atomically, so it always lists only finished shards."""
+    path = os.path.join(out_dir, MANIFEST)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def manifest_programs(out_dir):
+    """The program entries of every shard in the manifest of out_dir."""
+    return [p for shard in read_manifest(out_dir)["shards"] for p in shard["programs"]]
+
+
+def read_shard(out_dir, shard, verify=True):
+    """
+    Returns the results in a shard (an entry of the manifest). Raises ValueError
+    if verify is set and the shard does not match its SHA-256 in the manifest.
+    """
+    with open(os.path.join(out_dir, shard["path"]), "rb") as f:
+        data = f.read()
+    if verify and hashlib.sha256(data).hexdigest() != shard["sha256"]:
+        raise ValueError("Shard ({}) does not match its hash".format(shard["path"]))
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+class ShardWriter(object):
+    """
+    Writes results to shards of at most max_tasks results or (about) max_bytes
+    bytes each, like JsonlWriter. Each shard is added to the manifest when it is
+    finished. With append, shards are added after those already in the manifest.
+    """
+
+    def __init__(
+        self, out_dir, max_tasks=DEFAULT_SHARD_TASKS, max_bytes=None, append=False
+    ):
+        self.out_dir = out_dir
+        self.max_tasks = max_tasks
+        self.max_bytes = max_bytes
+        os.makedirs(out_dir, exist_ok=True)
+        self.manifest = read_manifest(out_dir) if append else {"shards": []}
+        write_manifest(out_dir, self.manifest)
+        self.f = None
+
+    def open_shard(self):
+        self.path = SHARD_NAME.format(len(self.manifest["shards"]))
+        self.f = open(os.path.join(self.out_dir, self.path), "wb")
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+        self.programs = []
+
+    def write(self, d):
+        if self.f is None:
+            self.open_shard()
+        d = serialize_result(d)
+        line = (json.dumps(d) + "\n").encode("utf-8")
+        self.f.write(line)
+        self.f.flush()
+        self.sha256.update(line)
+        self.bytes += len(line)
+        self.programs.append(
+            {
+                "source": d["program"],
+                "task_key": d.get("task_key"),
+                "examples": len(d["io_pairs"]),
+            }
+        )
+        if len(self.programs) >= self.max_tasks or (
+            self.max_bytes is not None and self.bytes >= self.max_bytes
+        ):
+            self.close_shard()
+
+    def close_shard(self):
+        self.f.close()
+        self.f = None
+        self.manifest["shards"].append(
+            {
+                "path": self.path,
+                "sha256": self.sha256.hexdigest(),
+                "bytes": self.bytes,
+                "tasks": len(self.programs),
+                "examples": sum(p["examples"] for p in self.programs),
+                "programs": self.programs,
+            }
+        )
+        write_manifest(self.out_dir, self.manifest)
+
+    def close(self):
+        if self.f is not None:
+            self.close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
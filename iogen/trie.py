@@ -0,0 +1,88 @@
+from iogen.compiler import parse_source
+
+
+class ExecutionError(object):
+    """Output of a program whose execution raised an exception."""
+
+    def __init__(self, error):
+        self.error = error
+
+    def __repr__(self):
+        return "ExecutionError({!r})".format(self.error)
+
+
+class TrieNode(object):
+    def __init__(self, function=None, pointers=None):
+        self.function = function
+        self.pointers = pointers
+        self.children = {}
+        self.programs = []  # programs whose last instruction is this node
+        self.subtree = set()  # programs whose instructions pass through this node
+
+
+class ProgramTrie(object):
+    """
+    Executes a corpus of programs that share input types, with the programs'
+    instructions (as parsed by parse_source) merged into a trie. Each shared
+    prefix of instructions is evaluated once per input, and execution only fans
+    out where programs differ, so the cost of a run scales with the number of
+    distinct instructions rather than with the total length of all programs.
+    """
+
+    def __init__(self, language, sources):
+        self.sources = list(sources)
+        self.input_types = None
+        self.root = TrieNode()
+        self.num_nodes = 0
+        for index, source in enumerate(self.sources):
+            functions, input_types, pointers, types = parse_source(language, source)
+            if self.input_types is None:
+                self.input_types = input_types
+            elif input_types != self.input_types:
+                raise ValueError(
+                    "Program ({}) has input types ({}), expected ({})".format(
+                        source, input_types, self.input_types
+                    )
+                )
+            node = self.root
+            node.subtree.add(index)
+            for t in range(len(input_types), len(types)):
+                key = (functions[t].src, tuple(pointers[t]))
+                if key not in node.children:
+                    node.children[key] = TrieNode(functions[t], pointers[t])
+                    self.num_nodes += 1
+                node = node.children[key]
+                node.subtree.add(index)
+            node.programs.append(index)
+
+    def __call__(self, args, active=None):
+        """
+        Runs every program (or only the programs in the set active) on args.
+        Returns a list with the output of each program, in corpus order; programs
+        that were not run have None, and programs that raised an ExecutionError.
+        """
+        assert len(args) == len(self.input_types)
+        outputs = [None] * len(self.sources)
+        self._run(self.root, list(args), outputs, active)
+        return outputs
+
+    def run_batch(self, inputs, active=None):
+        return [self(args, active) for args in inputs]
+
+    def _run(self, node, registers, outputs, active):
+        for index in node.programs:
+            if active is None or index in active:
+                outputs[index] = registers[-1]
+        for child in node.children.values():
+            if active is not None and active.isdisjoint(child.subtree):
+                continue
+            try:
+                res = child.function.fun(*[registers[p] for p in child.pointers])
+            except Exception as e:
+                for index in child.subtree:
+                    if active is None or index in active:
+                        outputs[index] = ExecutionError(e)
+                continue
+            registers.append(res)
+            self._run(child, registers, outputs, active)
+            registers.pop()
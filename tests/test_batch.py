@@ -0,0 +1,92 @@
+import random
+import unittest
+
+from iogen.batch import BatchExecutor, ListBatch, get_kernel
+from iogen.compiler import Executor, parse_source
+from iogen.dsl.extended import get_extended_dsl
+from iogen.dsl.linq import get_linq_dsl
+
+MAX_BOUND = 99
+
+
+def random_inputs(input_types, n, min_len=0, max_len=8):
+    inputs = []
+    for _ in range(n):
+        args = []
+        for t in input_types:
+            if t == int:
+                args.append(random.randint(-6, 12))
+            else:
+                length = random.randint(min_len, max_len)
+                args.append([random.randint(-9, 9) for _ in range(length)])
+        inputs.append(args)
+    return inputs
+
+
+def build_executors(language, source):
+    functions, input_types, pointers, types = parse_source(
+        language, source.replace(" | ", "\n")
+    )
+    args = (input_types, functions, pointers, len(types))
+    return input_types, Executor(*args), BatchExecutor(*args)
+
+
+class TestBatchExecutor(unittest.TestCase):
+    def verify_function(self, language, f):
+        inputs = ["a <- int", "b <- [int]", "c <- [int]"]
+        arg_names = []
+        for t in f.sig[:-1]:
+            arg_names.append(
+                "a" if t == int else ("b" if "b" not in arg_names else "c")
+            )
+        source = " | ".join(inputs + ["d <- " + f.src + " " + " ".join(arg_names)])
+        input_types, executor, batch_executor = build_executors(language, source)
+        inputs = random_inputs(input_types, 200)
+        try:
+            expected = [executor(args) for args in inputs]
+        except ValueError:
+            # e.g. max of an empty list, which has no defined output
+            inputs = random_inputs(input_types, 200, min_len=1)
+            expected = [executor(args) for args in inputs]
+        self.assertEqual(batch_executor.run_batch(inputs), expected, f.src)
+
+    def test_extended_functions(self):
+        random.seed(1)
+        language = get_extended_dsl(MAX_BOUND)
+        for f in language:
+            self.verify_function(language, f)
+
+    def test_linq_functions(self):
+        random.seed(2)
+        language, _ = get_linq_dsl(MAX_BOUND)
+        for f in language:
+            self.verify_function(language, f)
+
+    def test_kernels_exist(self):
+        language, _ = get_linq_dsl(MAX_BOUND)
+        for f in language:
+            self.assertIsNotNone(get_kernel(f), f.src)
+        missing = [f.src for f in get_extended_dsl(MAX_BOUND) if get_kernel(f) is None]
+        self.assertEqual(missing, ["unique"])
+
+    def test_program(self):
+        random.seed(3)
+        language = get_extended_dsl(MAX_BOUND)
+        source = "a <- [int] | b <- tail a | c <- unique b | d <- sort c | e <- last d"
+        input_types, executor, batch_executor = build_executors(language, source)
+        inputs = random_inputs(input_types, 200, min_len=1)
+        expected = [executor(args) for args in inputs]
+        self.assertEqual(batch_executor.run_batch(inputs), expected)
+        self.assertEqual(batch_executor(inputs[0]), expected[0])
+
+    def test_list_batch(self):
+        lists = [[1, 2, 3], [], [4]]
+        batch = ListBatch.from_lists(lists)
+        self.assertEqual(batch.data.shape, (3, 3))
+        self.assertEqual(batch.lengths.tolist(), [3, 0, 1])
+        self.assertEqual(batch.tolist(), lists)
+        self.assertEqual(ListBatch.from_lists([[], []]).tolist(), [[], []])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from benchmarks import run
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare(self):
+        results = {"a": 70.0, "b": 100.0, "c": 5.0}
+        baseline = {"a": 100.0, "b": 100.0}
+        rows, regressions = run.compare(results, baseline, threshold=0.25)
+        self.assertEqual(regressions, ["a"])
+        self.assertEqual(
+            rows,
+            [("a", 70.0, 100.0, 0.7), ("b", 100.0, 100.0, 1.0), ("c", 5.0, None, None)],
+        )
+        self.assertEqual(run.compare(results, baseline, threshold=0.5)[1], [])
+
+    def test_run_benchmarks(self):
+        results = run.run_benchmarks(["compile_program"], repeats=1, min_time=0.0)
+        self.assertEqual(
+            sorted(results), ["compile_program[maxv=10]", "compile_program[maxv=99]"]
+        )
+        assert all(ops > 0 for ops in results.values())
+
+    def test_baseline_covers_benchmarks(self):
+        baseline = run.load_baseline(run.DEFAULT_BASELINE)
+        for (name, _) in run.BENCHMARKS:
+            for maxv in run.MAXV_SETTINGS:
+                self.assertIn("{}[maxv={}]".format(name, maxv), baseline)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import unittest
+from tempfile import NamedTemporaryFile
+
+from iogen import iogen
+from iogen.columnar import ColumnarReader, write_columnar
+
+RESULTS = [
+    {
+        "program": "a <- [int] | b <- int | c <- take b a",
+        "io_pairs": [
+            {"i": [[1, 2, 3], 2], "o": [1, 2]},
+            {"i": [[], 0], "o": []},
+            {"i": [[7], -1], "o": []},
+        ],
+        "output_variance": 0.5,
+        "task_key": "abc",
+    },
+    {"program": "a <- [int] | b <- head a", "io_pairs": [], "output_variance": None},
+    {
+        "program": "a <- [int] | b <- sum a",
+        "io_pairs": [{"i": [[4, 5]], "o": 9}],
+        "output_variance": 0.0,
+    },
+]
+
+
+class TestColumnar(unittest.TestCase):
+    def test_round_trip(self):
+        with NamedTemporaryFile(suffix=".bin") as f:
+            write_columnar(RESULTS, f.name)
+            with ColumnarReader(f.name) as reader:
+                self.assertEqual(len(reader), 3)
+                self.assertEqual(reader.program(2), "a <- [int] | b <- sum a")
+                self.assertEqual(reader.num_examples(0), 3)
+                self.assertEqual(reader.num_examples(1), 0)
+                inputs, output = reader.example(0, 0)
+                self.assertEqual(inputs[0].tolist(), [1, 2, 3])
+                self.assertEqual(inputs[1], 2)
+                self.assertEqual(output.tolist(), [1, 2])
+                self.assertEqual(reader.example(2, 0)[1], 9)
+                with self.assertRaises(IndexError):
+                    reader.example(1, 0)
+                self.assertEqual(reader.task(0), RESULTS[0])
+                self.assertEqual(reader.task(2), RESULTS[2])
+                self.assertEqual(reader.task(1)["io_pairs"], [])
+                self.assertIsNone(reader.task_key(1))
+
+    def test_not_columnar(self):
+        with NamedTemporaryFile(suffix=".json", mode="w") as f:
+            json.dump(RESULTS, f)
+            f.flush()
+            with self.assertRaises(ValueError):
+                ColumnarReader(f.name)
+
+    def test_cli(self):
+        with NamedTemporaryFile(suffix=".bin") as f:
+            args = iogen.parse_args(
+                ["--binary", "--to-binary", f.name, "--max-samples", "1000"]
+            )
+            results = iogen.main(args)
+            with ColumnarReader(f.name) as reader:
+                self.assertEqual(len(reader), len(results))
+                for (index, d) in enumerate(results):
+                    task = reader.task(index)
+                    self.assertEqual(
+                        task["program"], d["program"].src.replace("\n", " | ")
+                    )
+                    self.assertEqual(task["io_pairs"], d["io_pairs"])
+                    self.assertEqual(task["task_key"], d["task_key"])
+
+    def test_bool_outputs(self):
+        with NamedTemporaryFile(mode="w+") as f, NamedTemporaryFile() as out:
+            f.write("a <- int | b <- int | c <- > a b")
+            f.flush()
+            args = iogen.parse_args(
+                ["--from-txt", f.name, "--binary", "--to-binary", out.name]
+                + ["--max-samples", "1000"]
+            )
+            results = iogen.main(args)
+            with ColumnarReader(out.name) as reader:
+                io_pairs = reader.task(0)["io_pairs"]
+        self.assertEqual(io_pairs, results[0]["io_pairs"])
+        self.assertTrue(all(type(pair["o"]) is bool for pair in io_pairs))
+
+
+if __name__ == "__main__":
+    unittest.main()
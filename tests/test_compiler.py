@@ -0,0 +1,94 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from iogen.batch import BatchExecutor
+from iogen.compiler import CodegenExecutor, compile_source
+from iogen.dsl.extended import get_extended_dsl
+from iogen.dsl.linq import get_linq_dsl
+from iogen.io import generate_io_pairs, test_io
+
+MAX_BOUND = 99
+MAXV = 10
+
+EXTENDED_SOURCES = [
+    "a <- [int] | b <- head a",
+    "a <- [int] | b <- tail a | c <- head a | d <- count c b",
+    "a <- [int] | b <- int | c <- map(+) b a | d <- sort c",
+    "a <- [int] | b <- int | c <- filter(>) b a | d <- sum c",
+    "a <- int | b <- [int] | c <- index a b | d <- count c b",
+]
+
+LINQ_SOURCES = [
+    "a <- int | b <- [int] | c <- SORT b | d <- TAKE a c | e <- SUM d",
+    "a <- [int] | b <- [int] | c <- ZIPWITH + a b | d <- SCANL1 MAX c",
+]
+
+
+class TestBackends(unittest.TestCase):
+    def verify_backends_agree(self, language, sources):
+        for source in sources:
+            interpreted, compiled, batched = [
+                compile_source(
+                    language, source, MAX_BOUND, MAXV, min_bound=0, backend=backend
+                )
+                for backend in ("interpreter", "codegen", "numpy")
+            ]
+            assert isinstance(compiled.fun, CodegenExecutor)
+            assert isinstance(batched.fun, BatchExecutor)
+            self.assertEqual(compiled.bounds, interpreted.bounds)
+            io_pairs = generate_io_pairs(interpreted, 50, MAX_BOUND)
+            for io_pair in io_pairs:
+                test_io(compiled, io_pair)
+            inputs = [i for (i, _) in io_pairs]
+            outputs = [o for (_, o) in io_pairs]
+            self.assertEqual(compiled.fun.run_batch(inputs), outputs)
+            self.assertEqual(batched.fun.run_batch(inputs), outputs)
+
+    def test_extended(self):
+        self.verify_backends_agree(get_extended_dsl(MAX_BOUND), EXTENDED_SOURCES)
+
+    def test_linq(self):
+        language, _ = get_linq_dsl(MAX_BOUND)
+        self.verify_backends_agree(language, LINQ_SOURCES)
+
+    def test_function_source(self):
+        program = compile_source(
+            get_extended_dsl(MAX_BOUND),
+            "a <- [int] | b <- int | c <- count b a",
+            MAX_BOUND,
+            MAXV,
+            min_bound=0,
+            backend="codegen",
+        )
+        self.assertEqual(
+            program.fun.source,
+            "def program(args):\n"
+            "    assert len(args) == 2\n"
+            "    r0, r1, = args\n"
+            "    try:\n"
+            "        r2 = f2(r1, r0)\n"
+            "    except TypeError:\n"
+            "        failed(args)\n"
+            "        raise\n"
+            "    return r2\n",
+        )
+
+    def test_codegen_errors_match_interpreter(self):
+        language = get_extended_dsl(MAX_BOUND)
+        source = "a <- [int] | b <- int | c <- count b a"
+        for backend in ("interpreter", "codegen"):
+            program = compile_source(
+                language, source, MAX_BOUND, MAXV, min_bound=0, backend=backend
+            )
+            with self.assertRaises(AssertionError):
+                program.fun([[1, 2]])
+            out = io.StringIO()
+            with redirect_stdout(out), self.assertRaises(TypeError):
+                program.fun([None, 1])
+            self.assertIn("ERROR: failed to execute program", out.getvalue())
+            self.assertIn("ERROR: func = ", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
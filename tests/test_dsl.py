@@ -0,0 +1,44 @@
+import unittest
+
+from iogen.compiler import get_language_dict
+from iogen.dsl import Language, get_language, get_language_func
+from iogen.dsl.extended import get_extended_dsl
+
+
+class TestLanguageRegistry(unittest.TestCase):
+    def test_language_is_built_once(self):
+        language = get_language("extended", 99, 0)
+        self.assertIs(get_language("extended", 99, 0), language)
+        self.assertIsNot(get_language("extended", 10, 0), language)
+        self.assertIsNot(get_language("linq", 99, 0), language)
+
+    def test_language_func(self):
+        f = get_language_func("linq")
+        language = f({"max_bound": 99, "min_bound": 0})
+        self.assertIs(f({"max_bound": 99, "min_bound": 0}), language)
+        self.assertIs(get_language("linq", 99, 0), language)
+
+    def test_unknown_language(self):
+        with self.assertRaises(ValueError):
+            get_language_func("cobol")
+        with self.assertRaises(ValueError):
+            get_language("cobol", 99)
+
+    def test_commands(self):
+        language = get_language("extended", 99, 0)
+        assert isinstance(language, Language)
+        self.assertEqual(len(language), len(get_extended_dsl(99)))
+        self.assertIs(get_language_dict(language), language.commands)
+        for name in ["head", "map(+)", "filter(>)", "filter(even?)"]:
+            self.assertEqual(language.commands[name].src, name)
+        linq = get_language("linq", 99, 0)
+        for name in ["SORT", "MAP INC", "ZIPWITH +", "SCANL1 MAX"]:
+            self.assertEqual(linq.commands[name].src, name)
+
+    def test_plain_language_dict(self):
+        language = get_extended_dsl(99)
+        self.assertEqual(get_language_dict(language)["sort"], language[8])
+
+
+if __name__ == "__main__":
+    unittest.main()
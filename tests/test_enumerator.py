@@ -0,0 +1,100 @@
+import subprocess
+import sys
+import unittest
+
+from iogen import enumerator
+from iogen.compiler import compile_program
+from iogen.dsl import get_language
+from iogen.fingerprint import ERROR, fingerprint, probe_inputs, run_on_probes
+
+
+def enumerate_sources(*args):
+    programs = []
+    args = enumerator.parse_args(list(args))
+    language = get_language(args.language, args.max_bound, args.min_bound)
+    input_types = [enumerator.INPUT_TYPES[t] for t in args.inputs]
+    probes = probe_inputs(input_types, max_value=args.maxv)
+    is_valid = enumerator.compiles(language, args.max_bound, args.maxv, args.min_bound)
+    e = enumerator.ProgramEnumerator(
+        language, input_types, args.max_length, probes, is_valid
+    )
+    for source in e.programs():
+        programs.append(source)
+    return language, probes, programs
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_probe_inputs_are_seeded(self):
+        self.assertEqual(probe_inputs([[int], int]), probe_inputs([[int], int]))
+        self.assertNotEqual(probe_inputs([[int]], seed=1), probe_inputs([[int]]))
+
+    def test_probe_inputs(self):
+        probes = probe_inputs([[int], int], num_probes=20, max_value=50, max_len=5)
+        self.assertEqual(len(probes), 20)
+        self.assertEqual(sorted(set(len(xs) for (xs, _) in probes)), [1, 2, 3, 4])
+        for xs, n in probes:
+            assert all(0 <= i < 50 for i in xs + [n])
+
+    def test_probe_inputs_bounds(self):
+        probes = probe_inputs([[int], int], bounds=[(20, 30), (-5, 3)])
+        for xs, n in probes:
+            assert all(20 <= i < 30 for i in xs)
+            assert -5 <= n < 3
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint([1, [2]]), fingerprint([1, [2]]))
+        self.assertNotEqual(fingerprint([1, [2]]), fingerprint([1, [3]]))
+        self.assertNotEqual(fingerprint([1, 0]), fingerprint([True, False]))
+
+    def test_run_on_probes(self):
+        self.assertEqual(
+            run_on_probes(lambda args: max(args[0]), [[[1, 3]], [[]]]), [3, ERROR]
+        )
+
+
+class TestEnumerator(unittest.TestCase):
+    def test_single_instruction(self):
+        _, _, programs = enumerate_sources("-k", "1", "--inputs", "[int]", "int")
+        self.assertEqual(
+            programs,
+            [
+                "a <- [int] | b <- int | c <- count b a",
+                "a <- [int] | b <- int | c <- index b a",
+                "a <- [int] | b <- int | c <- map(+) b a",
+                "a <- [int] | b <- int | c <- map(-) b a",
+                "a <- [int] | b <- int | c <- filter(>) b a",
+                "a <- [int] | b <- int | c <- filter(<) b a",
+                "a <- [int] | b <- int | c <- filter(>=) b a",
+                "a <- [int] | b <- int | c <- filter(<=) b a",
+                "a <- [int] | b <- int | c <- filter(==) b a",
+            ],
+        )
+
+    def test_programs_are_distinct(self):
+        language, probes, programs = enumerate_sources("-k", "2", "--language", "linq")
+        assert "a <- [int] | b <- SORT a" in programs
+        assert "a <- [int] | b <- REVERSE a | c <- REVERSE b" not in programs
+        self.assertEqual(len(programs), len(set(programs)))
+        fingerprints = set()
+        for source in programs:
+            program = compile_program(
+                language, source.replace(" | ", "\n"), 99, 99, min_bound=0
+            )
+            fingerprints.add(fingerprint(run_on_probes(program.fun, probes)))
+        self.assertEqual(len(fingerprints), len(programs))
+
+    def test_closed_pipe(self):
+        process = subprocess.Popen(
+            [sys.executable, "-m", "iogen.enumerator", "-k", "2"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        process.stdout.readline()
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.wait()
+        self.assertEqual(stderr, b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from tempfile import NamedTemporaryFile
+
+import numpy as np
+
+from iogen import iogen
+from iogen.compiler import compile_source
+from iogen.dsl.extended import get_extended_dsl
+from iogen.dsl.linq import get_linq_dsl
+from iogen.feasibility import Lists, analyze_output, output_bounds
+from iogen.io import (
+    check_feasibility,
+    generate_interesting,
+    sample_inputs,
+    sampled_range,
+)
+from iogen.pool import output_stat
+
+MAX_BOUND = 99
+EXTENDED = get_extended_dsl(MAX_BOUND, 0)
+LINQ = get_linq_dsl(MAX_BOUND, 0)[0]
+
+
+def feasibility(language, source, maxv=99, max_len=10):
+    program = compile_source(language, source, MAX_BOUND, maxv, min_bound=0)
+    return check_feasibility(language, program, 3.5, 1, max_len)
+
+
+class TestFeasibility(unittest.TestCase):
+    def test_infeasible(self):
+        self.assertEqual(
+            feasibility(EXTENDED, "a <- [int] | b <- filter(negative?) a"),
+            "the output is always an empty list",
+        )
+        self.assertEqual(
+            feasibility(LINQ, "a <- [int] | b <- MAP doNEG a | c <- HEAD b"),
+            "the output is always 0",
+        )
+        self.assertEqual(
+            feasibility(EXTENDED, "a <- [int] | b <- last a | c <- even? b"),
+            "outputs between 0 and 1 have a variance of at most 0.25",
+        )
+        self.assertEqual(
+            feasibility(EXTENDED, "a <- [int] | b <- len a", max_len=5),
+            "outputs between 1 and 4 have a variance of at most 2.25",
+        )
+
+    def test_feasible(self):
+        self.assertIsNone(feasibility(EXTENDED, "a <- [int] | b <- head a"))
+        self.assertIsNone(feasibility(EXTENDED, "a <- [int] | b <- len a"))
+        self.assertIsNone(
+            feasibility(EXTENDED, "a <- [int] | b <- int | c <- count b a")
+        )
+        # Unknown outputs are never infeasible
+        self.assertIsNone(feasibility(LINQ, "a <- [int] | b <- SCANL1 * a", maxv=5))
+
+    def test_sampled_outputs_within_bounds(self):
+        sources = [
+            (EXTENDED, "a <- [int] | b <- tail a | c <- head b | d <- count c a"),
+            (EXTENDED, "a <- [int] | b <- int | c <- map(+) b a | d <- sum c"),
+            (EXTENDED, "a <- [int] | b <- filter(even?) a | c <- unique b"),
+            (LINQ, "a <- [int] | b <- int | c <- DROP b a | d <- MAXIMUM c"),
+            (LINQ, "a <- [int] | b <- [int] | c <- ZIPWITH - a b | d <- SCANL1 + c"),
+            (LINQ, "a <- [int] | b <- FILTER isODD a | c <- COUNT isEVEN b"),
+        ]
+        for (language, source) in sources:
+            program = compile_source(language, source, MAX_BOUND, 5, min_bound=0)
+            output = analyze_output(
+                language, program, [sampled_range(*b) for b in program.bounds]
+            )
+            bounds = output_bounds(output)
+            self.assertIsNotNone(bounds, source)
+            inputs = sample_inputs(program, 500, rng=np.random.default_rng(0))
+            for o in program.fun.run_batch(inputs):
+                self.assertTrue(bounds.low <= output_stat(o) <= bounds.high, source)
+                if isinstance(output, Lists):
+                    self.assertTrue(output.min_len <= len(o) <= output.max_len)
+
+    def test_generate_interesting(self):
+        kwargs = dict(
+            num_examples=10,
+            max_bound=MAX_BOUND,
+            maxv=MAX_BOUND,
+            min_variance=3.5,
+            timeout=None,
+            min_bound=0,
+            show_progress=False,
+            max_samples=100000,
+        )
+        source = "a <- [int] | b <- last a | c <- even? b"
+        d = generate_interesting(EXTENDED, source, precheck="fast", **kwargs)
+        self.assertGreater(d["metrics"]["precheck_seconds"], 0.0)
+        self.assertEqual(d["samples"], 10)
+        self.assertEqual(len(d["io_pairs"]), 10)
+        self.assertIn("variance", d["infeasible"])
+        d = generate_interesting(EXTENDED, source, precheck="reject", **kwargs)
+        self.assertEqual(d["samples"], 0)
+        self.assertEqual(d["io_pairs"], [])
+        self.assertIn("variance", d["infeasible"])
+        d = generate_interesting(
+            EXTENDED, "a <- [int] | b <- head a", precheck="reject", **kwargs
+        )
+        self.assertNotIn("infeasible", d)
+        self.assertGreaterEqual(d["output_variance"], 3.5)
+        d = generate_interesting(EXTENDED, source, **dict(kwargs, max_samples=100))
+        self.assertEqual(d["metrics"]["precheck_seconds"], 0.0)
+
+    def test_share_prefixes(self):
+        sources = ["a <- [int] | b <- filter(negative?) a", "a <- [int] | b <- head a"]
+        with NamedTemporaryFile(mode="w+") as f:
+            f.write("\n".join(sources))
+            f.flush()
+            for (precheck, samples) in (("reject", 0), ("fast", 10)):
+                args = iogen.parse_args(
+                    ["--from-txt", f.name, "--share-prefixes", "--precheck", precheck]
+                    + ["--max-samples", "500"]
+                )
+                with redirect_stdout(io.StringIO()):
+                    results = iogen.main(args)
+                self.assertEqual(
+                    results[0]["infeasible"], "the output is always an empty list"
+                )
+                self.assertEqual(results[0]["samples"], samples)
+                self.assertNotIn("infeasible", results[1])
+                self.assertGreaterEqual(results[1]["output_variance"], 3.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
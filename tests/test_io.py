@@ -0,0 +1,319 @@
+import unittest
+
+import numpy as np
+
+from iogen.compiler import compile_source
+from iogen.dsl.extended import get_extended_dsl
+from iogen.io import (
+    biased_randint,
+    columns_to_inputs,
+    biased_randint_list,
+    generate_interesting,
+    generate_io_pairs,
+    get_biased_probabilities,
+    get_io_pairs_from_columns,
+    get_biased_sampler,
+    get_input_space,
+    input_to_list,
+    InputSpace,
+    keep_spread_pairs,
+    MAX_BATCH_SIZE,
+    mutate_input,
+    next_batch_size,
+    sample_input_columns,
+    sample_inputs,
+    sample_inputs_batched,
+    sample_inputs_stratified,
+    select_spread,
+    ShuffledRange,
+    test_io,
+)
+from iogen.pool import StratifiedPool
+
+MAX_BOUND = 99
+EXTENDED = get_extended_dsl(MAX_BOUND)
+COUNT_SOURCE = "a <- [int] | b <- int | c <- count b a"
+
+
+class TestBatchedSampling(unittest.TestCase):
+    def test_sample_inputs_batched(self):
+        program = compile_source(EXTENDED, COUNT_SOURCE, MAX_BOUND, 10, min_bound=0)
+        inputs = sample_inputs_batched(program, 50, min_len=2, max_len=6)
+        self.assertEqual(len(inputs), 50)
+        for (xs, n) in inputs:
+            assert isinstance(xs, list)
+            assert isinstance(n, int)
+            assert 2 <= len(xs) < 6
+            for i in xs:
+                assert isinstance(i, int)
+                assert program.bounds[0][0] <= i < program.bounds[0][1]
+            assert program.bounds[1][0] <= n < program.bounds[1][1]
+
+    def test_sample_inputs_batched_empty(self):
+        program = compile_source(
+            EXTENDED, "a <- [int] | b <- sort a", MAX_BOUND, 10, min_bound=0
+        )
+        self.assertEqual(sample_inputs_batched(program, 0), [])
+
+    def test_generate_io_pairs_batched(self):
+        program = compile_source(
+            EXTENDED, "a <- [int] | b <- sort a", MAX_BOUND, 99, min_bound=0
+        )
+        io_pairs = generate_io_pairs(program, 20, MAX_BOUND, batched=True)
+        self.assertEqual(len(io_pairs), 20)
+        for io_pair in io_pairs:
+            test_io(program, io_pair)
+
+
+class TestArrayValues(unittest.TestCase):
+    def test_io_pairs_from_columns(self):
+        source = "a <- [int] | b <- int | c <- map(+) b a | d <- sort c"
+        program = compile_source(
+            EXTENDED, source, MAX_BOUND, 99, min_bound=0, backend="numpy"
+        )
+        columns = sample_input_columns(
+            program, 50, max_len=200, rng=np.random.default_rng(0)
+        )
+        io_pairs = [
+            (input_to_list(i), o)
+            for (i, o) in get_io_pairs_from_columns(program, columns, MAX_BOUND)
+        ]
+        inputs = sample_inputs_batched(
+            program, 50, max_len=200, rng=np.random.default_rng(0)
+        )
+        self.assertEqual([i for (i, _) in io_pairs], inputs)
+        for io_pair in io_pairs:
+            test_io(program, io_pair)
+            self.assertIsInstance(io_pair[0][1], int)
+
+    def test_generate_interesting(self):
+        def generate(**kwargs):
+            return generate_interesting(
+                get_extended_dsl(MAX_BOUND, 0),
+                "a <- [int] | b <- sort a | c <- head b",
+                num_examples=10,
+                max_bound=MAX_BOUND,
+                maxv=99,
+                max_io_len=50,
+                min_variance=3.5,
+                timeout=None,
+                min_bound=0,
+                show_progress=False,
+                max_samples=500,
+                rng=np.random.default_rng(0),
+                **kwargs
+            )["io_pairs"]
+
+        io_pairs = generate(array_values=True)
+        self.assertEqual(io_pairs, generate(batched=True))
+        self.assertTrue(all(isinstance(p["i"][0], list) for p in io_pairs))
+
+
+class TestExhaustive(unittest.TestCase):
+    def test_input_space(self):
+        program = compile_source(EXTENDED, COUNT_SOURCE, MAX_BOUND, 4, min_bound=0)
+        space = InputSpace(program, min_len=1, max_len=4)
+        inputs = columns_to_inputs(space.decode(np.arange(space.size)))
+        self.assertEqual(len(inputs), space.size)
+        self.assertEqual(len(set(repr(i) for i in inputs)), space.size)
+        enumerated = set(repr(i) for i in inputs)
+        sampled = sample_inputs(program, 500, 1, 4, rng=np.random.default_rng(0))
+        for i in sampled:
+            self.assertIn(repr(i), enumerated)
+        self.assertIsNone(get_input_space(program, 1, 10, 1000))
+
+    def test_shuffled_range(self):
+        for size in (0, 1, 2, 12, 97, 360):
+            order = ShuffledRange(size, np.random.default_rng(size))
+            indices = list(order[: size // 3]) + list(order[size // 3 : size + 1])
+            self.assertEqual(sorted(indices), list(range(size)))
+        order = ShuffledRange(10 ** 12, np.random.default_rng(0))
+        self.assertTrue(all(0 <= i < 10 ** 12 for i in order[10 ** 12 - 5 :]))
+
+    def test_keep_spread_pairs(self):
+        io_pairs = [([i], i % 5) for i in range(20)]
+        by_key = {}
+        keep_spread_pairs(by_key, io_pairs[:12], 3)
+        keep_spread_pairs(by_key, io_pairs[12:], 3)
+        self.assertEqual(sorted(by_key), [0, 1, 2, 3, 4])
+        self.assertEqual(by_key[1], [([1], 1), ([6], 1), ([11], 1)])
+        kept = [pair for pairs in by_key.values() for pair in pairs]
+        self.assertEqual(select_spread(kept, 3, 1.0), select_spread(io_pairs, 3, 1.0))
+
+    def test_select_spread(self):
+        io_pairs = [([i], i % 5) for i in range(20)]
+        chosen = select_spread(io_pairs, 5, min_variance=1.0)
+        self.assertEqual(sorted(o for (_, o) in chosen), [0, 1, 2, 3, 4])
+        chosen = select_spread(io_pairs, 6, min_variance=3.5)
+        self.assertEqual(sorted(o for (_, o) in chosen), [0, 0, 0, 4, 4, 4])
+        self.assertEqual(len(set(repr(i) for (i, _) in chosen)), 6)
+
+    def test_generate_interesting(self):
+        kwargs = dict(
+            num_examples=10,
+            max_bound=5,
+            maxv=5,
+            max_io_len=5,
+            min_variance=3.5,
+            timeout=None,
+            min_bound=0,
+            show_progress=False,
+            exhaustive_threshold=1000,
+            max_samples=100000,
+        )
+        for array_values in (False, True):
+            d = generate_interesting(
+                get_extended_dsl(5, 0),
+                "a <- [int] | b <- head a",
+                rng=np.random.default_rng(0),
+                array_values=array_values,
+                **kwargs
+            )
+            self.assertTrue(d["exhausted_inputs"])
+            self.assertEqual(d["samples"], d["input_space_size"])
+            self.assertFalse(d["hit_max_samples"])
+            self.assertGreaterEqual(d["output_variance"], 3.5)
+            self.assertEqual(len(d["io_pairs"]), 10)
+
+
+class TestStratifiedSampling(unittest.TestCase):
+    def test_mutate_input(self):
+        program = compile_source(EXTENDED, COUNT_SOURCE, MAX_BOUND, 10, min_bound=0)
+        for _ in range(200):
+            original = [[1, 2, 3], 4]
+            xs, n = mutate_input(program, original, min_len=2, max_len=5)
+            self.assertEqual(original, [[1, 2, 3], 4])
+            assert 2 <= len(xs) < 5
+            assert all(program.bounds[0][0] <= i < program.bounds[0][1] for i in xs)
+            assert program.bounds[1][0] <= n < program.bounds[1][1]
+
+    def test_sample_inputs_stratified(self):
+        program = compile_source(EXTENDED, COUNT_SOURCE, MAX_BOUND, 10, min_bound=0)
+        pool = StratifiedPool(10)
+        self.assertEqual(len(sample_inputs_stratified(program, pool, 10)), 10)
+        pool.extend(generate_io_pairs(program, 10, MAX_BOUND))
+        inputs = sample_inputs_stratified(program, pool, 10, batched=True)
+        self.assertEqual(len(inputs), 10)
+        for input_value in inputs:
+            test_io(program, (input_value, program.fun(input_value)))
+
+    def test_stratified_reaches_min_variance(self):
+        # counts of an int in a list with items up to 99 are nearly always 0 or 1
+        source = "a <- int | b <- [int] | c <- count a b"
+        language = get_extended_dsl(MAX_BOUND, 0)
+        d = generate_interesting(
+            language,
+            source,
+            num_examples=10,
+            max_bound=MAX_BOUND,
+            maxv=99,
+            min_variance=3.5,
+            timeout=10,
+            min_bound=0,
+            show_progress=False,
+            stratified=True,
+        )
+        self.assertFalse(d["hit_timeout"])
+        self.assertGreaterEqual(d["output_variance"], 3.5)
+        self.assertEqual(len(d["io_pairs"]), 10)
+
+
+class TestSeededSampling(unittest.TestCase):
+    def test_samplers_are_reproducible(self):
+        program = compile_source(EXTENDED, COUNT_SOURCE, MAX_BOUND, 10, min_bound=0)
+        for sample in (sample_inputs, sample_inputs_batched):
+            self.assertEqual(
+                sample(program, 20, rng=np.random.default_rng(1)),
+                sample(program, 20, rng=np.random.default_rng(1)),
+            )
+            self.assertNotEqual(
+                sample(program, 20, rng=np.random.default_rng(1)),
+                sample(program, 20, rng=np.random.default_rng(2)),
+            )
+
+    def test_generate_interesting_is_reproducible(self):
+        def generate(seed, **kwargs):
+            d = generate_interesting(
+                get_extended_dsl(MAX_BOUND, 0),
+                "a <- int | b <- [int] | c <- count a b",
+                num_examples=10,
+                max_bound=MAX_BOUND,
+                maxv=99,
+                min_variance=3.5,
+                timeout=None,
+                min_bound=0,
+                show_progress=False,
+                max_samples=500,
+                rng=np.random.default_rng(seed),
+                **kwargs
+            )
+            return (d["io_pairs"], d["samples"])
+
+        for kwargs in ({}, {"stratified": True, "adaptive_batch": True}):
+            self.assertEqual(generate(3, **kwargs), generate(3, **kwargs))
+            self.assertNotEqual(generate(3, **kwargs), generate(4, **kwargs))
+
+
+class TestSampleBudget(unittest.TestCase):
+    def generate(self, **kwargs):
+        language = get_extended_dsl(MAX_BOUND, 0)
+        return generate_interesting(
+            language,
+            "a <- [int] | b <- head a",
+            num_examples=10,
+            max_bound=MAX_BOUND,
+            maxv=10,
+            min_variance=1e9,
+            timeout=None,
+            min_bound=0,
+            show_progress=False,
+            **kwargs
+        )
+
+    def test_max_samples(self):
+        d = self.generate(max_samples=55)
+        self.assertEqual(d["samples"], 55)
+        self.assertTrue(d["hit_max_samples"])
+        self.assertFalse(d["hit_timeout"])
+        self.assertEqual(len(d["io_pairs"]), 10)
+
+    def test_adaptive_batch(self):
+        d = self.generate(max_samples=5000, adaptive_batch=True)
+        self.assertEqual(d["samples"], 5000)
+        self.assertTrue(d["hit_max_samples"])
+
+    def test_next_batch_size(self):
+        self.assertEqual(next_batch_size(10, 0, 10), 20)
+        self.assertEqual(next_batch_size(40, 10, 10), 20)
+        self.assertEqual(next_batch_size(10, 10, 10), 10)
+        self.assertEqual(next_batch_size(MAX_BATCH_SIZE, 0, 10), MAX_BATCH_SIZE)
+        self.assertEqual(next_batch_size(10, 0, 5000), 5000)
+
+
+class TestBiasedSampler(unittest.TestCase):
+    def test_sampler_is_cached(self):
+        self.assertIs(get_biased_sampler(0, 99), get_biased_sampler(0, 99))
+
+    def test_matches_biased_probabilities(self):
+        probs = get_biased_probabilities(0, 20)
+        xs = get_biased_sampler(0, 20).sample_array(20000)
+        for i in range(20):
+            observed = (xs == i).sum() / 20000.0
+            self.assertAlmostEqual(observed, probs[i], delta=0.015)
+
+    def test_bounds(self):
+        for (minv, maxv) in [(0, 99), (3, 8), (-5, 20), (12, 40), (0, 5000000)]:
+            xs = biased_randint_list(minv, maxv, 1000)
+            self.assertEqual(len(xs), 1000)
+            assert all(isinstance(i, int) for i in xs)
+            assert all(minv <= i < maxv for i in xs)
+            assert minv <= biased_randint(minv, maxv) < maxv
+
+    def test_bias(self):
+        xs = biased_randint_list(0, 99, 10000)
+        under = len([i for i in xs if i <= 10]) / 10000.0
+        self.assertAlmostEqual(under, 0.847, delta=0.03)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from iogen.dsl.extended import get_extended_dsl
+from iogen.io import generate_interesting, generate_interesting_shared
+from iogen.metrics import PHASES, Metrics, RunMetrics, format_prometheus
+
+SOURCES = ["a <- [int] | b <- head a", "a <- [int] | b <- tail a | c <- head b"]
+
+
+def generate(source, **kwargs):
+    return generate_interesting(
+        get_extended_dsl(99, 0),
+        source,
+        num_examples=10,
+        max_bound=99,
+        maxv=99,
+        min_bound=0,
+        show_progress=False,
+        **kwargs
+    )
+
+
+class TestMetrics(unittest.TestCase):
+    def test_metrics(self):
+        metrics = Metrics()
+        with metrics.timer("sampling"):
+            pass
+        metrics.add_time("execution", 2.0)
+        metrics.count("samples", 10)
+        metrics.count("accepted", 4)
+        metrics.count("rounds")
+        d = metrics.as_dict(runtime_seconds=4.0)
+        self.assertGreater(d["sampling_seconds"], 0.0)
+        self.assertEqual(d["execution_seconds"], 2.0)
+        self.assertEqual((d["samples"], d["accepted"], d["rounds"]), (10, 4, 1))
+        self.assertEqual(d["samples_per_second"], 2.5)
+        self.assertEqual(d["acceptance_ratio"], 0.4)
+
+    def test_empty_metrics(self):
+        d = Metrics().as_dict()
+        self.assertIsNone(d["samples_per_second"])
+        self.assertIsNone(d["acceptance_ratio"])
+
+    def test_task_metrics(self):
+        d = generate(SOURCES[0], max_samples=100, min_variance=1e9)
+        metrics = d["metrics"]
+        self.assertEqual(metrics["samples"], 100)
+        self.assertEqual(metrics["rounds"], 10)
+        self.assertGreaterEqual(metrics["accepted"], 10)
+        for phase in PHASES:
+            self.assertGreaterEqual(metrics["{}_seconds".format(phase)], 0.0)
+        self.assertLessEqual(
+            sum(metrics["{}_seconds".format(p)] for p in PHASES),
+            d["runtime_seconds"],
+        )
+
+    def test_shared_metrics(self):
+        results = generate_interesting_shared(
+            get_extended_dsl(99, 0),
+            SOURCES,
+            num_examples=10,
+            max_bound=99,
+            maxv=99,
+            min_bound=0,
+            min_variance=1e9,
+            max_samples=50,
+            show_progress=False,
+        )
+        for d in results:
+            self.assertEqual(d["metrics"]["samples"], 50)
+            self.assertEqual(d["metrics"]["rounds"], 5)
+
+    def test_run_metrics(self):
+        run_metrics = RunMetrics(top=1)
+        results = [generate(s, max_samples=20, min_variance=1e9) for s in SOURCES]
+        for d in results:
+            run_metrics.add(d)
+        d = run_metrics.as_dict()
+        self.assertEqual(d["tasks"], 2)
+        self.assertEqual(d["budget_exhausted"], 2)
+        self.assertEqual(d["samples"], 40)
+        self.assertEqual(len(d["slowest_programs"]), 1)
+        slowest = max(results, key=lambda r: r["runtime_seconds"])
+        self.assertEqual(
+            d["slowest_programs"][0]["program"],
+            slowest["program"].src.replace("\n", " | "),
+        )
+        text = format_prometheus(run_metrics)
+        self.assertIn("iogen_tasks_total 2\n", text)
+        self.assertIn("iogen_samples_total 40\n", text)
+        self.assertIn('iogen_phase_seconds_total{phase="sampling"} ', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import random
+import unittest
+
+from iogen.io import get_output_variance, get_outputs, reduce_io_pairs
+from iogen.pool import IOPool, RunningVariance, StratifiedPool, output_key
+
+
+def pairs_for(outputs):
+    return [((i,), o) for (i, o) in enumerate(outputs)]
+
+
+class TestIOPool(unittest.TestCase):
+    def test_output_key(self):
+        self.assertEqual(output_key([1, 2]), (1, 2))
+        self.assertEqual(output_key(3), 3)
+        self.assertEqual(hash(output_key([1, 2])), hash(output_key([1, 2])))
+
+    def test_capacity(self):
+        pool = IOPool(3)
+        pool.extend(pairs_for([1, 2, 3, 4, 5]))
+        self.assertEqual(len(pool), 3)
+        self.assertEqual([o for (_, o) in pool.pairs()], [1, 2, 3])
+
+    def test_evicts_most_frequent_duplicates(self):
+        pool = IOPool(4)
+        pool.extend(pairs_for([0, 0, 0, 1, 0, 1, 2, 3]))
+        self.assertEqual(sorted(o for (_, o) in pool.pairs()), [0, 1, 2, 3])
+
+    def test_keeps_first_occurrence(self):
+        pool = IOPool(2)
+        pool.extend(pairs_for([[5], [5], [5], [6]]))
+        self.assertEqual(pool.pairs(), [((0,), [5]), ((3,), [6])])
+
+    def test_counts(self):
+        pool = IOPool(10)
+        pool.extend(pairs_for([[], [], [1], 2]))
+        self.assertEqual(pool.count(()), 2)
+        self.assertEqual(pool.count((1,)), 1)
+        self.assertEqual(pool.count(2), 1)
+        self.assertEqual(pool.count(3), 0)
+
+    def test_matches_reduce_io_pairs(self):
+        random.seed(0)
+        streams = [[[1, 2, 3, 3, 0, 0, 3, 3, 0, 1], [3, 1, 1, 3, 1, 1, 2, 2, 0, 0]]]
+        for _ in range(200):
+            high = random.randint(1, 12)
+            # the first round fills the pool: reduce_io_pairs drops duplicates
+            # from fewer than num_examples pairs, which the pool does not
+            sizes = [10] + [random.randint(1, 15) for _ in range(20)]
+            streams.append([[random.randint(0, high) for _ in range(n)] for n in sizes])
+        for rounds in streams:
+            pool = IOPool(10)
+            io_pairs = []
+            for outputs in rounds:
+                latest = pairs_for(outputs)
+                pool.extend(latest)
+                io_pairs = reduce_io_pairs(io_pairs + latest, 10)
+                self.assertEqual(pool.pairs(), io_pairs)
+
+    def test_add_returns_evicted(self):
+        pool = IOPool(1)
+        self.assertIsNone(pool.add(((0,), 1)))
+        self.assertEqual(pool.add(((1,), 1)), ((1,), 1))
+        self.assertEqual(pool.add(((2,), 2)), ((2,), 2))
+        self.assertEqual(pool.pairs(), [((0,), 1)])
+
+
+class TestStratifiedPool(unittest.TestCase):
+    def test_buckets_by_output_stat(self):
+        pool = StratifiedPool(10)
+        pool.extend(pairs_for([[1, 2], [3], [2, 2], True, 1]))
+        self.assertEqual(pool.count(3), 2)
+        self.assertEqual(pool.count(4), 1)
+        self.assertEqual(pool.count(1), 2)
+        self.assertEqual([o for (_, o) in pool.bucket_pairs()], [[1, 2], [2, 2], True])
+
+    def test_rejects_buckets_over_quota(self):
+        pool = StratifiedPool(4)
+        pool.extend(pairs_for([0, 0, 1, 1]))
+        self.assertEqual(pool.quota(), 2)
+        self.assertEqual(pool.add(((4,), 0)), ((4,), 0))
+        self.assertEqual(pool.add(((5,), 2)), ((1,), 0))
+        self.assertEqual(sorted(o for (_, o) in pool.pairs()), [0, 1, 1, 2])
+
+    def test_keeps_spread_of_distinct_outputs(self):
+        pool = StratifiedPool(3)
+        pool.extend(pairs_for([4, 5, 6, 0, 10]))
+        self.assertEqual(sorted(o for (_, o) in pool.pairs()), [0, 6, 10])
+        self.assertEqual(len(pool), 3)
+
+    def test_evicts_closest_to_mean(self):
+        random.seed(0)
+        outputs = random.sample(range(-500, 500), 300)
+        pool = StratifiedPool(50)
+        for pair in pairs_for(outputs):
+            kept = pool.pairs()
+            if len(kept) == 50:
+                mean = sum(o for (_, o) in kept + [pair]) / 51.0
+                expected = min(kept, key=lambda p: abs(p[1] - mean))
+                self.assertEqual(pool.add(pair), expected)
+            else:
+                self.assertIsNone(pool.add(pair))
+
+
+class TestRunningVariance(unittest.TestCase):
+    def test_add_remove(self):
+        moments = RunningVariance()
+        self.assertIsNone(moments.variance())
+        for x in [1, 5, 2, 8]:
+            moments.add(x)
+        moments.remove(5)
+        self.assertAlmostEqual(moments.variance(), 9.555555555555555)
+        for x in [1, 2, 8]:
+            moments.remove(x)
+        self.assertIsNone(moments.variance())
+
+    def test_pool_variance_matches_output_variance(self):
+        random.seed(0)
+        for outputs in (
+            [random.randint(0, 20) for _ in range(200)],
+            [
+                [random.randint(0, 9) for _ in range(random.randint(0, 4))]
+                for _ in range(200)
+            ],
+            [random.random() < 0.5 for _ in range(200)],
+        ):
+            pool = IOPool(10)
+            for pair in pairs_for(outputs):
+                pool.add(pair)
+                expected = get_output_variance(get_outputs(pool.pairs()))
+                if expected is None:
+                    self.assertIsNone(pool.variance())
+                else:
+                    self.assertAlmostEqual(pool.variance(), expected)
+
+    def test_all_empty_lists(self):
+        pool = IOPool(5)
+        pool.extend(pairs_for([[], [], []]))
+        self.assertIsNone(pool.variance())
+        self.assertFalse(pool.is_interesting(0.0))
+        pool.add(((3,), [4]))
+        self.assertTrue(pool.is_interesting(0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from tempfile import NamedTemporaryFile
+
+from iogen.resume import canonical_source, read_jsonl_results, task_key
+
+KWARGS = {"min_bound": 0, "max_bound": 99, "maxv": 99, "num_examples": 10}
+
+
+class TestResume(unittest.TestCase):
+    def test_canonical_source(self):
+        expected = "a <- [int] | b <- head a"
+        self.assertEqual(canonical_source("a <- [int] | b <- head a"), expected)
+        self.assertEqual(canonical_source("a <- [int]\nb <- head a\n"), expected)
+        self.assertEqual(canonical_source(" a <- [int] |b  <- head a"), expected)
+
+    def test_task_key(self):
+        key = task_key("a <- [int] | b <- head a", "extended", KWARGS)
+        self.assertEqual(key, task_key("a <- [int]\nb <- head a", "extended", KWARGS))
+        self.assertNotEqual(
+            key, task_key("a <- [int] | b <- last a", "extended", KWARGS)
+        )
+        self.assertNotEqual(key, task_key("a <- [int] | b <- head a", "linq", KWARGS))
+        kwargs = dict(KWARGS, maxv=10)
+        self.assertNotEqual(
+            key, task_key("a <- [int] | b <- head a", "extended", kwargs)
+        )
+
+    def test_task_key_optional_params(self):
+        key = task_key("a <- [int] | b <- head a", "extended", KWARGS)
+        unset = dict(
+            KWARGS,
+            max_samples=None,
+            stratified=False,
+            seed=None,
+            precheck=None,
+            exhaustive_threshold=None,
+        )
+        self.assertEqual(key, task_key("a <- [int] | b <- head a", "extended", unset))
+        keys = set([key])
+        for kwargs in (
+            {"seed": 0},
+            {"seed": 1},
+            {"max_samples": 100},
+            {"stratified": True},
+            {"precheck": "fast"},
+            {"precheck": "reject"},
+            {"exhaustive_threshold": 1000},
+        ):
+            keys.add(
+                task_key("a <- [int] | b <- head a", "extended", dict(unset, **kwargs))
+            )
+        self.assertEqual(len(keys), 8)
+
+    def test_read_jsonl_results_truncates_partial_line(self):
+        with NamedTemporaryFile(mode="w+") as f:
+            f.write('{"task_key": "x"}\n{"task_key": "y"}\n{"task_')
+            f.flush()
+            self.assertEqual(
+                read_jsonl_results(f.name), [{"task_key": "x"}, {"task_key": "y"}]
+            )
+            f.seek(0)
+            self.assertEqual(f.read(), '{"task_key": "x"}\n{"task_key": "y"}\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import threading
+import unittest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from iogen import iogen
+from iogen.server import GenerationServer, RequestError, parse_request
+
+LIST_HEAD_SOURCE = "a <- [int] | b <- head a"
+
+
+class TestParseRequest(unittest.TestCase):
+    def test_sources(self):
+        body = json.dumps({"sources": [LIST_HEAD_SOURCE]}).encode("utf-8")
+        language_name, tasks = parse_request(body, "extended")
+        self.assertEqual(language_name, "extended")
+        self.assertEqual(tasks, [{"source": LIST_HEAD_SOURCE}])
+
+    def test_invalid(self):
+        for body in [b"{", b"[]", b'{"language": "x"}', b'{"tasks": [{}]}']:
+            with self.assertRaises(RequestError):
+                parse_request(body, "extended")
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        args = iogen.parse_args(["--serve", "--port", "0", "--seed", "0"])
+        cls.server = GenerationServer(args)
+        cls.url = "http://{}:{}".format(*cls.server.server_address[:2])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join()
+        cls.server.server_close()
+
+    def post(self, d):
+        data = json.dumps(d).encode("utf-8")
+        with urlopen(self.url + "/generate", data=data) as response:
+            return json.load(response)
+
+    def test_health(self):
+        with urlopen(self.url + "/health") as response:
+            self.assertEqual(json.load(response)["status"], "ok")
+
+    def test_generate(self):
+        tasks = [
+            {"source": LIST_HEAD_SOURCE, "kwargs": {"num_examples": 5}},
+            {"source": "a <- [int] | b <- tail a"},
+        ]
+        first = self.post({"tasks": tasks})["results"]
+        second = self.post({"tasks": tasks})["results"]
+        self.assertEqual([d["program"] for d in first], [t["source"] for t in tasks])
+        self.assertEqual(len(first[0]["io_pairs"]), 5)
+        for pair in first[0]["io_pairs"]:
+            self.assertEqual(pair["o"], pair["i"][0][0])
+        # Seeded results do not depend on the compiled program being cached.
+        self.assertEqual(
+            [d["io_pairs"] for d in first], [d["io_pairs"] for d in second]
+        )
+
+    def test_task_error(self):
+        results = self.post({"sources": ["a <- [int] | b <- nosuchfunction a"]})
+        self.assertIn("error", results["results"][0])
+
+    def test_bad_request(self):
+        with self.assertRaises(HTTPError) as cm:
+            urlopen(self.url + "/generate", data=b"{")
+        self.assertEqual(cm.exception.code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import unittest
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+
+from iogen import iogen
+from iogen.shards import ShardWriter, manifest_programs, read_manifest, read_shard
+
+
+def result(i):
+    return {
+        "program": "a <- [int] | b <- take {} a".format(i),
+        "io_pairs": [{"i": [[i]], "o": [i]}] * (i + 1),
+        "task_key": str(i),
+    }
+
+
+class TestShards(unittest.TestCase):
+    def test_roll_over_by_tasks(self):
+        with TemporaryDirectory() as out_dir:
+            with ShardWriter(out_dir, max_tasks=2) as writer:
+                for i in range(5):
+                    writer.write(result(i))
+            shards = read_manifest(out_dir)["shards"]
+            self.assertEqual([s["tasks"] for s in shards], [2, 2, 1])
+            self.assertEqual([s["examples"] for s in shards], [3, 7, 5])
+            self.assertEqual(shards[1]["programs"][0]["source"], result(2)["program"])
+            self.assertEqual(
+                [d for s in shards for d in read_shard(out_dir, s)],
+                [result(i) for i in range(5)],
+            )
+
+    def test_roll_over_by_bytes(self):
+        with TemporaryDirectory() as out_dir:
+            with ShardWriter(out_dir, max_bytes=1) as writer:
+                for i in range(3):
+                    writer.write(result(i))
+            shards = read_manifest(out_dir)["shards"]
+            self.assertEqual([s["tasks"] for s in shards], [1, 1, 1])
+
+    def test_corrupt_shard(self):
+        with TemporaryDirectory() as out_dir:
+            with ShardWriter(out_dir, max_tasks=1) as writer:
+                for i in range(2):
+                    writer.write(result(i))
+            shards = read_manifest(out_dir)["shards"]
+            with open(os.path.join(out_dir, shards[0]["path"]), "ab") as f:
+                f.write(b"\n")
+            with self.assertRaises(ValueError):
+                read_shard(out_dir, shards[0])
+            self.assertEqual(read_shard(out_dir, shards[1]), [result(1)])
+
+    def test_cli_resume(self):
+        sources = [
+            "a <- [int] | b <- head a",
+            "a <- [int] | b <- tail a",
+            "a <- [int] | b <- last a",
+        ]
+        with NamedTemporaryFile(mode="w+") as f, TemporaryDirectory() as out_dir:
+            f.write("\n".join(sources[:2]))
+            f.flush()
+            argv = ["--from-txt", f.name, "--out-dir", out_dir, "--shard-tasks", "2"]
+            argv += ["--max-samples", "1000"]
+            self.assertIsNone(iogen.main(iogen.parse_args(argv)))
+            f.seek(0)
+            f.write("\n".join(sources))
+            f.flush()
+            iogen.main(iogen.parse_args(argv + ["--resume"]))
+            shards = read_manifest(out_dir)["shards"]
+            self.assertEqual(
+                [s["path"] for s in shards], sorted(os.listdir(out_dir))[1:]
+            )
+            self.assertEqual([p["source"] for p in manifest_programs(out_dir)], sources)
+            results = [d for s in shards for d in read_shard(out_dir, s)]
+            self.assertEqual([d["program"] for d in results], sources)
+
+
+if __name__ == "__main__":
+    unittest.main()
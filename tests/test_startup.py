@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+# Seconds that ./io -h may take on top of starting the Python interpreter. This is
+# generous so that the check is not flaky on a loaded machine (the imports it
+# guards against are checked directly by test_help_is_lazy), and can be set with
+# the IOGEN_STARTUP_BUDGET environment variable.
+STARTUP_BUDGET = float(os.environ.get("IOGEN_STARTUP_BUDGET", 0.5))
+
+
+def loaded_modules(code):
+    """Modules under iogen, numpy and tqdm loaded by running code in a new process."""
+    script = (
+        "import json, sys\n"
+        + code
+        + "\nprint(json.dumps(sorted(m for m in sys.modules"
+        + " if m.split('.')[0] in ('iogen', 'numpy', 'tqdm'))))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", script], stdout=subprocess.PIPE, check=True
+    ).stdout
+    return set(json.loads(out.decode("utf-8").splitlines()[-1]))
+
+
+def best_runtime(cmd, repeats=5):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class TestStartup(unittest.TestCase):
+    def test_parse_args_is_lazy(self):
+        modules = loaded_modules(
+            "from iogen import iogen\niogen.parse_args(['--language', 'linq'])"
+        )
+        self.assertNotIn("numpy", modules)
+        self.assertNotIn("tqdm", modules)
+        self.assertNotIn("iogen.io", modules)
+        self.assertNotIn("iogen.dsl.linq", modules)
+
+    def test_help_is_lazy(self):
+        modules = loaded_modules(
+            "from iogen import iogen\n"
+            "try:\n"
+            "    iogen.parse_args(['-h'])\n"
+            "except SystemExit:\n"
+            "    pass"
+        )
+        self.assertNotIn("numpy", modules)
+        self.assertNotIn("tqdm", modules)
+        self.assertNotIn("iogen.io", modules)
+        self.assertFalse(any(m.startswith("iogen.dsl.") for m in modules))
+
+    def test_only_selected_dsl_is_loaded(self):
+        modules = loaded_modules(
+            "from iogen.dsl import get_language\nget_language('linq', 99, 0)"
+        )
+        self.assertIn("iogen.dsl.linq", modules)
+        self.assertNotIn("iogen.dsl.extended", modules)
+        self.assertNotIn("iogen.dsl.simple", modules)
+        self.assertNotIn("numpy", modules)
+
+    def test_startup_budget(self):
+        interpreter = best_runtime([sys.executable, "-c", "pass"])
+        cli = best_runtime([sys.executable, "-m", "iogen.iogen", "-h"])
+        self.assertLess(cli - interpreter, STARTUP_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
+import io
 import json
 from tempfile import NamedTemporaryFile
 import unittest
+from contextlib import redirect_stderr, redirect_stdout
 
 from iogen import iogen
 
@@ -30,6 +32,194 @@ class TestTaskGen(unittest.TestCase):
             result = iogen.main(args)
             self.verify_list_head_result(result)
 
+    def test_jobs(self):
+        sources = [
+            LIST_HEAD_SOURCE,
+            "a <- [int] | b <- tail a",
+            "a <- [int] | b <- last a",
+        ]
+        with NamedTemporaryFile(mode="w+") as f:
+            f.write("\n".join(sources))
+            f.seek(0)
+            args = iogen.parse_args(["--from-txt", f.name, "--jobs", "2"])
+            result = iogen.main(args)
+        self.assertEqual(
+            [d["program"].src for d in result],
+            [s.replace(" | ", "\n") for s in sources],
+        )
+        self.verify_list_head_result(result[:1])
+
+    def test_seed(self):
+        sources = [LIST_HEAD_SOURCE, "a <- int | b <- [int] | c <- count a b"]
+        results = []
+        with NamedTemporaryFile(mode="w+") as f:
+            f.write("\n".join(sources))
+            f.seek(0)
+            for extra_args in (["--seed", "5"], ["--seed", "5", "--jobs", "2"]):
+                args = iogen.parse_args(
+                    ["--from-txt", f.name, "--max-samples", "200"] + extra_args
+                )
+                results.append([d["io_pairs"] for d in iogen.main(args)])
+            # a task's samples do not depend on its position in the corpus
+            f.seek(0)
+            f.write("\n".join(reversed(sources)))
+            f.seek(0)
+            args = iogen.parse_args(
+                ["--from-txt", f.name, "--max-samples", "200", "--seed", "5"]
+            )
+            results.append([d["io_pairs"] for d in reversed(iogen.main(args))])
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+    def test_share_prefixes(self):
+        sources = [LIST_HEAD_SOURCE, "a <- int | b <- [int] | c <- count a b"]
+        with NamedTemporaryFile(mode="w+") as f:
+            f.write("\n".join(sources))
+            f.seek(0)
+            args = iogen.parse_args(["--from-txt", f.name, "--share-prefixes"])
+            result = iogen.main(args)
+        self.assertEqual(
+            [d["program"].src for d in result],
+            [s.replace(" | ", "\n") for s in sources],
+        )
+        self.verify_list_head_result(result[:1])
+
+    def test_dedup(self):
+        sources = [
+            "a <- [int] | b <- sort a | c <- reverse b | d <- reverse c",
+            LIST_HEAD_SOURCE,
+            "a <- [int] | b <- sort a",
+            "a <- [int] | b <- reverse a | c <- head b",
+        ]
+        with NamedTemporaryFile(mode="w+") as f:
+            f.write("\n".join(sources))
+            f.seek(0)
+            args = iogen.parse_args(["--from-txt", f.name, "--dedup"])
+            result = iogen.main(args)
+        self.assertEqual(
+            [d["program"].src.replace("\n", " | ") for d in result], sources[1:]
+        )
+        self.assertEqual(result[1]["equivalent"], sources[:1])
+        assert "equivalent" not in result[0]
+
+    def test_dedup_probes_match_program_bounds(self):
+        # Programs get probes of their own input types and bounds: the probes
+        # for maxv 5 are not reused for the default maxv
+        args = iogen.parse_args([])
+        probes = {}
+        for task in [
+            {"source": "a <- [int] | b <- head a", "kwargs": {"maxv": 5}},
+            {"source": LIST_HEAD_SOURCE},
+            {"source": "a <- [int] | b <- int | c <- index b a"},
+        ]:
+            key = iogen.get_task_fingerprint(args, task, probes)
+            self.assertIn(key[0], probes)
+        self.assertEqual(len(probes), 3)
+        for (domain, inputs) in probes.items():
+            bounds = json.loads(domain)[2]
+            for probe in inputs:
+                for (value, (low, high)) in zip(probe, bounds):
+                    values = value if isinstance(value, list) else [value]
+                    assert all(low <= v < high for v in values)
+
+    def test_jsonl(self):
+        with NamedTemporaryFile(mode="w+") as f, NamedTemporaryFile() as out:
+            f.write("\n".join([LIST_HEAD_SOURCE, "a <- [int] | b <- tail a"]))
+            f.seek(0)
+            args = iogen.parse_args(
+                ["--from-txt", f.name, "--jsonl", "--to-jsonl", out.name]
+            )
+            self.assertIsNone(iogen.main(args))
+            with open(out.name) as g:
+                lines = [json.loads(line) for line in g]
+        self.assertEqual(
+            [d["program"] for d in lines],
+            [LIST_HEAD_SOURCE, "a <- [int] | b <- tail a"],
+        )
+        self.assertEqual(len(lines[0]["io_pairs"]), 10)
+
+    def test_share_prefixes_jsonl_streams_groups(self):
+        # The second program, in a group of its own, fails after the first group
+        # is done: max of the empty list tail returns for single items
+        sources = [LIST_HEAD_SOURCE, "a <- int | b <- [int] | c <- tail b | d <- max c"]
+        with NamedTemporaryFile(mode="w+") as f, NamedTemporaryFile() as out:
+            f.write("\n".join(sources))
+            f.seek(0)
+            args = iogen.parse_args(
+                ["--from-txt", f.name, "--share-prefixes", "--jsonl"]
+                + ["--to-jsonl", out.name, "--max-samples", "100", "--max-io-len", "2"]
+            )
+            with redirect_stdout(io.StringIO()), self.assertRaises(ValueError):
+                iogen.main(args)
+            with open(out.name) as g:
+                lines = [json.loads(line) for line in g]
+        self.assertEqual([d["program"] for d in lines], sources[:1])
+
+    def test_resume_jsonl(self):
+        sources = [LIST_HEAD_SOURCE, "a <- [int] | b <- tail a"]
+        with NamedTemporaryFile(mode="w+") as f, NamedTemporaryFile() as out:
+            f.write(sources[0])
+            f.seek(0)
+            args = iogen.parse_args(
+                ["--from-txt", f.name, "--jsonl", "--to-jsonl", out.name]
+            )
+            iogen.main(args)
+            with open(out.name) as g:
+                first_line = g.readline()
+            f.seek(0)
+            f.write("\n".join(sources))
+            f.seek(0)
+            args = iogen.parse_args(
+                ["--from-txt", f.name, "--jsonl", "--to-jsonl", out.name, "--resume"]
+            )
+            iogen.main(args)
+            with open(out.name) as g:
+                lines = g.readlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0], first_line)
+        self.assertEqual([json.loads(l)["program"] for l in lines], sources)
+
+    def test_max_samples_replaces_timeout(self):
+        kwargs = iogen.get_generation_kwargs(iogen.parse_args([]), {})
+        self.assertEqual((kwargs["timeout"], kwargs["max_samples"]), (10, None))
+        args = iogen.parse_args(["--max-samples", "100"])
+        kwargs = iogen.get_generation_kwargs(args, {})
+        self.assertEqual((kwargs["timeout"], kwargs["max_samples"]), (None, 100))
+        args = iogen.parse_args(["--max-samples", "100", "-t", "5"])
+        self.assertEqual(iogen.get_generation_kwargs(args, {})["timeout"], 5)
+
+    def test_metrics_files(self):
+        with NamedTemporaryFile(mode="w+") as f, NamedTemporaryFile() as metrics_json:
+            f.write(LIST_HEAD_SOURCE)
+            f.seek(0)
+            with NamedTemporaryFile(mode="r") as metrics_prom:
+                args = iogen.parse_args(
+                    [
+                        "--from-txt",
+                        f.name,
+                        "--metrics-json",
+                        metrics_json.name,
+                        "--metrics-prom",
+                        metrics_prom.name,
+                    ]
+                )
+                result = iogen.main(args)
+                prom = metrics_prom.read()
+            with open(metrics_json.name) as g:
+                summary = json.load(g)
+        self.assertEqual(summary["tasks"], 1)
+        self.assertEqual(summary["samples"], result[0]["metrics"]["samples"])
+        self.assertIn("iogen_tasks_total 1\n", prom)
+
+    def test_resume_requires_output_file(self):
+        with self.assertRaises(SystemExit):
+            iogen.parse_args(["--resume"])
+
+    def test_share_prefixes_rejects_executor_options(self):
+        for option in (["--array-values"], ["--backend", "numpy"]):
+            with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                iogen.parse_args(["--share-prefixes"] + option)
+
     def verify_list_head_result(self, result):
         assert isinstance(result, list)
         self.assertEqual(len(result), 1)
@@ -0,0 +1,130 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from iogen.compiler import compile_source
+from iogen.dsl import get_language
+from iogen.io import (
+    generate_interesting,
+    generate_interesting_shared,
+    sample_inputs,
+    test_io,
+)
+from iogen.trie import ExecutionError, ProgramTrie
+
+MAX_BOUND = 99
+
+SOURCES = [
+    "a <- [int] | b <- head a",
+    "a <- [int] | b <- tail a",
+    "a <- [int] | b <- tail a | c <- head a | d <- count c b",
+    "a <- [int] | b <- tail a | c <- len a | d <- count c b",
+    "a <- [int] | b <- tail a | c <- last a | d <- count c b",
+    "a <- [int] | b <- tail a | c <- len b | d <- count c b",
+]
+
+
+class TestProgramTrie(unittest.TestCase):
+    def setUp(self):
+        self.language = get_language("extended", MAX_BOUND, 0)
+        self.sources = [s.replace(" | ", "\n") for s in SOURCES]
+
+    def test_shares_prefixes(self):
+        trie = ProgramTrie(self.language, self.sources)
+        # head, tail, and one head/len/last/len-of-tail node plus count per program
+        self.assertEqual(trie.num_nodes, 2 + 2 * 4)
+
+    def test_matches_programs(self):
+        trie = ProgramTrie(self.language, self.sources)
+        programs = [
+            compile_source(self.language, s, MAX_BOUND, 10, min_bound=0)
+            for s in self.sources
+        ]
+        inputs = sample_inputs(programs[0], 50, min_len=1, max_len=10)
+        for args in inputs:
+            outputs = trie(args)
+            self.assertEqual(outputs, [p.fun(args) for p in programs])
+
+    def test_active(self):
+        trie = ProgramTrie(self.language, self.sources)
+        outputs = trie([[3, 5, 3]], active={0, 2})
+        self.assertEqual(outputs, [3, None, 1, None, None, None])
+
+    def test_execution_error(self):
+        sources = ["a <- [int]\nb <- max a", "a <- [int]\nb <- len a"]
+        trie = ProgramTrie(self.language, sources)
+        outputs = trie([[]])
+        assert isinstance(outputs[0], ExecutionError)
+        self.assertEqual(outputs[1], 0)
+
+    def test_input_types_must_match(self):
+        with self.assertRaises(ValueError):
+            ProgramTrie(
+                self.language, ["a <- [int]\nb <- len a", "a <- int\nb <- [int]"]
+            )
+
+    def test_generate_interesting_shared(self):
+        sources = SOURCES + ["a <- int | b <- [int] | c <- count a b"]
+        results = generate_interesting_shared(
+            self.language,
+            sources,
+            num_examples=10,
+            max_bound=MAX_BOUND,
+            maxv=10,
+            min_variance=1.0,
+            timeout=2,
+            min_bound=0,
+            show_progress=False,
+        )
+        self.assertEqual(len(results), len(sources))
+        for source, d in zip(sources, results):
+            self.assertEqual(d["program"].src, source.replace(" | ", "\n"))
+            self.assertEqual(len(d["io_pairs"]), 10)
+            for io_pair in d["io_pairs"]:
+                test_io(d["program"], (io_pair["i"], io_pair["o"]))
+
+    def test_shared_execution_errors_are_raised(self):
+        # max fails on the empty list that tail returns for a single item
+        source = "a <- [int] | b <- tail a | c <- max b"
+        kwargs = dict(
+            num_examples=10,
+            max_bound=MAX_BOUND,
+            maxv=10,
+            max_io_len=3,
+            min_variance=1.0,
+            timeout=None,
+            max_samples=1000,
+            min_bound=0,
+            show_progress=False,
+        )
+        with self.assertRaises(ValueError):
+            generate_interesting(self.language, source, **kwargs)
+        with redirect_stdout(io.StringIO()), self.assertRaises(ValueError):
+            generate_interesting_shared(self.language, [source], **kwargs)
+
+    def test_shared_exhaustive(self):
+        sources = ["a <- [int] | b <- head a", "a <- [int] | b <- last a"]
+        results = generate_interesting_shared(
+            get_language("extended", 5, 0),
+            sources,
+            num_examples=10,
+            max_bound=5,
+            maxv=5,
+            max_io_len=5,
+            min_variance=3.5,
+            timeout=None,
+            max_samples=100000,
+            min_bound=0,
+            show_progress=False,
+            exhaustive_threshold=1000,
+        )
+        for d in results:
+            self.assertTrue(d["exhausted_inputs"])
+            self.assertEqual(d["samples"], d["input_space_size"])
+            self.assertFalse(d["hit_max_samples"] or d["hit_timeout"])
+            self.assertGreaterEqual(d["output_variance"], 3.5)
+            self.assertEqual(len(d["io_pairs"]), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()